@@ -0,0 +1,145 @@
+"""
+A single-pass engine for the largest distance between two numbers.
+
+The largest distance is always between the minimum and the maximum, so there
+is no need to sort the numbers or to build an optimization model. The engine
+consumes the numbers in chunks, such that also inputs that do not fit into
+memory (or into a pydantic list) can be processed, e.g., numbers streamed
+from a file.
+"""
+
+import itertools
+import typing
+
+import numpy as np  # pip install numpy
+from data_schema import Solution
+
+# Number of values that are converted to a NumPy array at once.
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def _as_array(values: typing.Sequence[int]) -> np.ndarray:
+    """
+    Convert integers to an int64 array. Values outside of the int64 range
+    fall back to an object array, whose values are compared as Python ints.
+    """
+    try:
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    except OverflowError:
+        return np.array(values, dtype=object)
+
+
+def _parse_tokens(tokens: typing.List[bytes]) -> np.ndarray:
+    """
+    Parse integer tokens, with the same int64 fallback as `_as_array`.
+    """
+    try:
+        return np.array(tokens).astype(np.int64)
+    except OverflowError:
+        return _as_array([int(token) for token in tokens])
+
+
+class MinMaxScan:
+    """
+    Keeps track of the minimum and maximum of all numbers seen so far.
+    Only constant memory is needed, independent of the number of values.
+    """
+
+    def __init__(self) -> None:
+        self.minimum: typing.Optional[int] = None
+        self.maximum: typing.Optional[int] = None
+        self.count = 0
+
+    def update(self, chunk: typing.Union[np.ndarray, typing.Sequence[int]]) -> None:
+        """
+        Add a chunk of numbers to the scan.
+        """
+        values = chunk if isinstance(chunk, np.ndarray) else _as_array(chunk)
+        if values.size == 0:
+            return
+        lo, hi = int(values.min()), int(values.max())
+        self.minimum = lo if self.minimum is None else min(self.minimum, lo)
+        self.maximum = hi if self.maximum is None else max(self.maximum, hi)
+        self.count += values.size
+
+    def to_solution(self) -> Solution:
+        """
+        Return the two numbers with the largest distance.
+        """
+        if self.minimum is None or self.maximum is None:
+            msg = "Cannot select two numbers from an empty input."
+            raise ValueError(msg)
+        return Solution(
+            number_a=self.minimum,
+            number_b=self.maximum,
+            distance=self.maximum - self.minimum,
+        )
+
+
+def chunked(
+    numbers: typing.Iterable[int], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> typing.Iterator[np.ndarray]:
+    """
+    Split an arbitrary iterable of integers into NumPy arrays of at most
+    `chunk_size` values without materializing the whole iterable.
+    """
+    iterator = iter(numbers)
+    while values := list(itertools.islice(iterator, chunk_size)):
+        yield _as_array(values)
+
+
+def solve_chunks(
+    chunks: typing.Iterable[typing.Union[np.ndarray, typing.Sequence[int]]],
+) -> Solution:
+    """
+    Find the largest distance in numbers that are given as a sequence of
+    chunks, e.g., NumPy arrays or lists.
+    """
+    scan = MinMaxScan()
+    for chunk in chunks:
+        scan.update(chunk)
+    return scan.to_solution()
+
+
+def solve_numbers(
+    numbers: typing.Union[np.ndarray, typing.Iterable[int]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Solution:
+    """
+    Find the largest distance in a NumPy array or an iterable of integers.
+    The input is not modified.
+    """
+    if isinstance(numbers, np.ndarray):
+        return solve_chunks([numbers])
+    return solve_chunks(chunked(numbers, chunk_size))
+
+
+def read_number_chunks(
+    path: str, block_size: int = 1 << 24
+) -> typing.Iterator[np.ndarray]:
+    """
+    Read whitespace-separated integers from a text file in blocks of
+    `block_size` bytes. A number that is cut by a block boundary is
+    carried over to the next block.
+    """
+    with open(path, "rb") as f:
+        remainder = b""
+        while block := f.read(block_size):
+            block = remainder + block
+            # the last token may be incomplete, unless the block ends with whitespace
+            cut = max(block.rfind(b" "), block.rfind(b"\n"), block.rfind(b"\t"))
+            if cut < 0:
+                remainder = block
+                continue
+            block, remainder = block[:cut], block[cut:]
+            yield _parse_tokens(block.split())
+        if remainder.strip():
+            yield _parse_tokens(remainder.split())
+
+
+def solve_file(path: str) -> Solution:
+    """
+    Find the largest distance in a file of whitespace-separated integers,
+    which may be much larger than the available memory.
+    """
+    return solve_chunks(read_number_chunks(path))
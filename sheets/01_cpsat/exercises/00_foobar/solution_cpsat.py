@@ -1,4 +1,5 @@
 from data_schema import Instance, Solution
+from max_distance import MinMaxScan
 from ortools.sat.python import cp_model
 
 
@@ -6,11 +7,14 @@ def solve(instance: Instance) -> Solution:
     """
     Implement your solver for the problem here!
     """
-    numbers = instance.numbers
+    # The domain bounds only need a single scan over the numbers.
+    bounds = MinMaxScan()
+    bounds.update(instance.numbers)
+    lo, hi = bounds.minimum, bounds.maximum
     model = cp_model.CpModel()
-    x = model.NewIntVar(min(numbers),max(numbers), "x")
-    y = model.NewIntVar(min(numbers),max(numbers), "y")
-    abs_diff = model.NewIntVar(0,max(numbers)-min(numbers), "abs_diff")
+    x = model.NewIntVar(lo, hi, "x")
+    y = model.NewIntVar(lo, hi, "y")
+    abs_diff = model.NewIntVar(0, hi - lo, "abs_diff")
     #model.add(abs_diff == max(x,y)-min(x,y))
     model.AddAbsEquality(abs_diff, x - y)
     model.Maximize(abs_diff)
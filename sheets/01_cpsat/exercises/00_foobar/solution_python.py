@@ -1,15 +1,11 @@
 from data_schema import Instance, Solution
+from max_distance import solve_numbers
 
 
 def solve(instance: Instance) -> Solution:
     """
     Implement your solver for the problem here!
     """
-    numbers = instance.numbers
-    
-    numbers.sort()
-    return Solution(
-        number_a=numbers[0],
-        number_b=numbers[-1],
-        distance=abs(numbers[0] - numbers[-1]),
-    )
+    # A single pass for the minimum and maximum is sufficient. In contrast to
+    # sorting, this is linear and does not modify the instance.
+    return solve_numbers(instance.numbers)
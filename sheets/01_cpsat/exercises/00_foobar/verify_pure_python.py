@@ -1,5 +1,9 @@
+import os
+import tempfile
+
 from _alglab_utils import CHECK, main, mandatory_testcase
 from data_schema import Instance
+from max_distance import solve_file
 from solution_python import solve
 
 
@@ -87,5 +91,27 @@ def random_numbers():
     CHECK(solution.distance == max_distances, "The distance is not optimal.")
 
 
+@mandatory_testcase(max_runtime_s=10)
+def huge_numbers_test():
+    numbers = [10**20, 3, -(10**20)]
+    solution = solve(Instance(numbers=numbers))
+    CHECK(solution.distance == 2 * 10**20, "The distance is not optimal.")
+
+
+@mandatory_testcase(max_runtime_s=10)
+def huge_numbers_file_test():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "numbers.txt")
+        with open(path, "w") as f:
+            f.write("1 99999999999999999999999\n-5\n")
+        solution = solve_file(path)
+    CHECK(solution.number_a == -5, "The minimum is not correct.")
+    CHECK(solution.number_b == 99999999999999999999999, "The maximum is not correct.")
+    CHECK(
+        solution.distance == 99999999999999999999999 + 5,
+        "The distance is not optimal.",
+    )
+
+
 if __name__ == "__main__":
     main()
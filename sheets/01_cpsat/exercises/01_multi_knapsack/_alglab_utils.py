@@ -3,13 +3,15 @@ This file contains utils for checking the correctness of the solutions.
 Do not modify this file!
 
 Author: Dominik Krupke
-Version: 2023-11-11
+Version: 2024-05-24
 """
 
+import collections
 import inspect
 import os
 import subprocess
 import sys
+import threading
 import time
 import typing
 
@@ -18,6 +20,91 @@ from tqdm import tqdm  # pip install tqdm
 # A dictionary with all tests that should be run.
 _check_list = {}
 
+# Only the last lines of a test's output are kept in memory and shown on failure.
+# Solvers with enabled logging can be very chatty, so we must not buffer everything.
+_OUTPUT_TAIL_LINES = 200
+# The output is read in chunks of this size (in bytes).
+_READ_CHUNK_BYTES = 65536
+# Very long lines are split into chunks of this size (in bytes).
+_MAX_LINE_BYTES = 4096
+# If this environment variable is set, the full output of each test is written
+# to '<directory>/<test name>.log'.
+_LOG_DIR_ENV_VAR = "ALGLAB_LOG_DIR"
+
+
+class _OutputCapture:
+    """
+    Reads the output of a subprocess line by line in a background thread.
+    Only the last lines are kept in a ring buffer, such that the memory stays
+    constant no matter how much the process prints. Optionally, the full
+    output is spilled to a log file and the latest line is shown as live
+    progress.
+    """
+
+    def __init__(
+        self,
+        stream,
+        name: str,
+        max_lines: int = _OUTPUT_TAIL_LINES,
+        log_path: typing.Optional[str] = None,
+    ):
+        self._stream = stream
+        self.tail = collections.deque(maxlen=max_lines)
+        self.num_lines = 0
+        self.log_path = log_path
+        self._log_file = open(log_path, "w") if log_path else None  # noqa: SIM115
+        self._progress = tqdm(
+            desc=f"  {name}", unit=" lines", leave=False, mininterval=0.5
+        )
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        # Reading larger chunks and splitting them is much faster than
+        # calling readline for every line of a chatty process.
+        partial = b""
+        while chunk := self._stream.read1(_READ_CHUNK_BYTES):
+            lines = (partial + chunk).split(b"\n")
+            partial = lines.pop()
+            if len(partial) > _MAX_LINE_BYTES:  # do not let a single line grow unbounded
+                lines.append(partial)
+                partial = b""
+            self._add_lines(lines)
+        if partial:
+            self._add_lines([partial])
+
+    def _add_lines(self, raw_lines: typing.List[bytes]):
+        lines = [line.decode("utf-8", errors="replace").rstrip("\r") for line in raw_lines]
+        self.tail.extend(lines)
+        self.num_lines += len(lines)
+        if self._log_file:
+            self._log_file.writelines(line + "\n" for line in lines)
+        if lines:
+            self._progress.update(len(lines))
+            self._progress.set_postfix_str(lines[-1][:60], refresh=False)
+
+    def close(self):
+        """
+        Wait until the stream has been read completely and release all resources.
+        """
+        self._thread.join()
+        self._stream.close()
+        self._progress.close()
+        if self._log_file:
+            self._log_file.close()
+
+    def print_tail(self):
+        """
+        Print the buffered last lines of the output.
+        """
+        skipped = self.num_lines - len(self.tail)
+        if skipped > 0:
+            print(f"[... {skipped} lines omitted ...]")
+        for line in self.tail:
+            print(line)
+        if self.log_path:
+            print(f"Full output written to '{self.log_path}'.")
+
 
 class _TestCase:
     def __init__(self, func, max_runtime_s):
@@ -34,26 +121,24 @@ class _TestCase:
         """
         self.func()
 
-    def _on_timeout(self, proc):
+    def _on_timeout(self, proc, output: _OutputCapture):
         proc.kill()
-        outs, errs = proc.communicate()
-        # decode output
-        outs = outs.decode("utf-8")
-        errs = errs.decode("utf-8")
-        # print output
-        print(outs)
-        print(errs)
+        proc.wait()
+        output.close()
+        output.print_tail()
         print(f"Test '{self.func_name}' timed out after {self.max_runtime_s} seconds.")
 
-    def _on_error(self, outs, errs):
-        # decode output
-        outs = outs.decode("utf-8")
-        errs = errs.decode("utf-8")
-        # print output
-        print(outs)
-        print(errs)
+    def _on_error(self, output: _OutputCapture):
+        output.print_tail()
         print(f"Test '{self.func_name}' failed.")
 
+    def _get_log_path(self) -> typing.Optional[str]:
+        log_dir = os.environ.get(_LOG_DIR_ENV_VAR)
+        if not log_dir:
+            return None
+        os.makedirs(log_dir, exist_ok=True)
+        return os.path.join(log_dir, f"{self.func_name}.log")
+
     def _create_subprocess(self):
         cmd = [
             sys.executable,
@@ -61,27 +146,32 @@ class _TestCase:
             self.func_file,
             self.func_name,
         ]
-        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # stderr is merged into stdout to keep the order of the output.
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
 
     def run_in_subprocess(self):
         """
         Run in subprocess with time limit. Return True if the function
         terminates without error in time. Capture the output of the
-        function and print it in case of an error.
+        function and print its tail in case of an error.
         """
         print(f"Running test '{self.func_name}'...")
         assert os.path.exists(self.func_file)
         # create subprocess
         proc = self._create_subprocess()
+        output = _OutputCapture(
+            proc.stdout, self.func_name, log_path=self._get_log_path()
+        )
         # wait for process to terminate
         try:
-            outs, errs = proc.communicate(timeout=self.max_runtime_s)
+            proc.wait(timeout=self.max_runtime_s)
         except subprocess.TimeoutExpired:
-            self._on_timeout(proc)
+            self._on_timeout(proc, output)
             return False
+        output.close()
         # check if there was an error
         if proc.returncode != 0:
-            self._on_error(outs, errs)
+            self._on_error(output)
             return False
         return True
 
@@ -0,0 +1,95 @@
+"""
+Benchmark the time to optimality of the MultiKnapsackSolver for different
+numbers of CP-SAT workers (and search portfolios) on the bundled instances.
+
+Usage: python3 benchmark_workers.py --workers 1 2 4 8 --portfolio default core
+       [--warm-start greedy lp] [--instances instances/75i_6k.json]
+"""
+
+import argparse
+import glob
+import os
+import typing
+
+from cpsat_config import CpSatConfig, Portfolio
+from data_schema import ColumnarInstance, Solution
+from solution import MultiKnapsackSolver
+from warm_start import WarmStart
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
+
+
+def benchmark(
+    instance_path: str,
+    config: CpSatConfig,
+    timelimit: float,
+    warm_start: WarmStart = WarmStart.GREEDY,
+) -> typing.Tuple[MultiKnapsackSolver, Solution]:
+    instance = ColumnarInstance.from_json_file(instance_path)
+    solver = MultiKnapsackSolver(instance, config=config, warm_start=warm_start)
+    return solver, solver.solve(timelimit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sweep the number of CP-SAT workers on the multi-knapsack instances."
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    parser.add_argument(
+        "--portfolio",
+        type=Portfolio,
+        nargs="+",
+        default=[Portfolio.DEFAULT],
+        choices=list(Portfolio),
+    )
+    parser.add_argument("--no-hints", action="store_true", help="Disable hints.")
+    parser.add_argument(
+        "--warm-start",
+        type=WarmStart,
+        nargs="+",
+        default=[WarmStart.GREEDY],
+        choices=list(WarmStart),
+    )
+    parser.add_argument("--timelimit", type=float, default=60.0)
+    parser.add_argument(
+        "--instances",
+        nargs="+",
+        default=sorted(glob.glob(os.path.join(INSTANCE_DIR, "*.json"))),
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'instance':<20} {'portfolio':<10} {'start':<6} {'workers':>7} "
+        f"{'build[s]':>9} {'solve[s]':>9} {'speedup':>8} {'hint':>9} "
+        f"{'first[s]':>9} {'value':>9} {'gap':>7}"
+    )
+    warm_starts = [None] if args.no_hints else args.warm_start
+    for path in args.instances:
+        for portfolio in args.portfolio:
+            for warm_start in warm_starts:
+                baseline = None
+                for num_workers in args.workers:
+                    config = CpSatConfig(
+                        num_workers=num_workers,
+                        portfolio=portfolio,
+                        use_hints=warm_start is not None,
+                    )
+                    solver, solution = benchmark(
+                        path, config, args.timelimit, warm_start or WarmStart.GREEDY
+                    )
+                    baseline = baseline or solver.solve_time
+                    nan = float("nan")
+                    gap = solution.gap if solution.gap is not None else nan
+                    hint = solution.hint_value if solution.hint_value is not None else "-"
+                    first = solution.time_to_first_solution
+                    print(
+                        f"{os.path.basename(path):<20} {portfolio!s:<10} "
+                        f"{warm_start or '-'!s:<6} {num_workers:>7} "
+                        f"{solver.build_time:>9.3f} {solver.solve_time:>9.3f} "
+                        f"{baseline / solver.solve_time:>8.2f} {hint:>9} "
+                        f"{first if first is not None else nan:>9.3f} "
+                        f"{solution.value:>9} {gap:>7.2%}",
+                        flush=True,
+                    )
@@ -1,8 +1,15 @@
-from typing import List
+import json
+from typing import List, Optional
 from uuid import UUID, uuid4
 
+import numpy as np  # pip install numpy
 from pydantic import BaseModel, Field, model_validator
 
+try:
+    import orjson  # pip install orjson (optional, faster JSON parsing)
+except ImportError:
+    orjson = None
+
 
 class Item(BaseModel):
     """
@@ -36,6 +43,95 @@ class Instance(BaseModel):
         return cls(items=items, capacities=capacities)
 
 
+class ColumnarInstance:
+    """
+    A columnar representation of a multi-knapsack instance, which avoids
+    creating (and validating) an `Item` object for every item when loading
+    large instances. The values and weights are stored as NumPy arrays and
+    the `Item` objects are only created when they are actually needed, e.g.,
+    when a `Solution` is emitted.
+
+    Attributes:
+    - values (np.ndarray): the value of each item.
+    - weights (np.ndarray): the weight of each item.
+    - capacities (List[int]): the capacity of each knapsack.
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        weights: np.ndarray,
+        capacities: List[int],
+        items: Optional[List[Item]] = None,
+    ) -> None:
+        self.values = np.asarray(values, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.int64)
+        assert self.values.shape == self.weights.shape, "The instance is invalid!"
+        self.capacities = [int(c) for c in capacities]
+        self._items = items
+        self._item_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def from_instance(cls, instance: Instance) -> "ColumnarInstance":
+        """
+        Convert an `Instance`. The original `Item` objects are kept, such that
+        solutions refer to the same items as the instance.
+        """
+        return cls(
+            values=np.fromiter((item.value for item in instance.items), np.int64),
+            weights=np.fromiter((item.weight for item in instance.items), np.int64),
+            capacities=instance.capacities,
+            items=instance.items,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ColumnarInstance":
+        capacities = [t["capacity"] for t in data["knapsacks"]]
+        assert data["num_knapsacks"] == len(capacities), "The instance is invalid!"
+        items = data["items"]
+        assert data["num_items"] == len(items), "The instance is invalid!"
+        values = np.fromiter((t["value"] for t in items), np.int64, len(items))
+        weights = np.fromiter((t["weight"] for t in items), np.int64, len(items))
+        return cls(values=values, weights=weights, capacities=capacities)
+
+    @classmethod
+    def from_json_file(cls, path: str) -> "ColumnarInstance":
+        """
+        Load an instance from a JSON file, using orjson if it is installed.
+        """
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read()) if orjson else json.load(f)
+        return cls.from_dict(data)
+
+    def item(self, i: int) -> Item:
+        """
+        Return the `Item` object for the i-th item. It is created on first
+        access and afterwards the same object is returned.
+        """
+        if self._items is not None:
+            return self._items[i]
+        if i not in self._item_cache:
+            self._item_cache[i] = Item(
+                value=int(self.values[i]), weight=int(self.weights[i])
+            )
+        return self._item_cache[i]
+
+    @property
+    def items(self) -> List[Item]:
+        """
+        All `Item` objects. Prefer `item(i)` if only a few are needed.
+        """
+        if self._items is None:
+            self._items = [self.item(i) for i in range(len(self))]
+        return self._items
+
+    def to_instance(self) -> Instance:
+        return Instance(items=self.items, capacities=self.capacities)
+
+
 class Solution(BaseModel):
     """
     A class representing a solution to the multi-knapsack problem.
@@ -44,6 +140,37 @@ class Solution(BaseModel):
     knapsacks: List[List[Item]] = Field(
         description="A list of lists of items, representing the items in each knapsack. The first list represents the items in the first knapsack, the second list the items in the second knapsack, and so on."
     )
+    upper_bound: Optional[float] = Field(
+        default=None,
+        description="An upper bound on the optimal value, if known. It equals the value of the solution if the solution is proven to be optimal.",
+    )
+    hint_value: Optional[int] = Field(
+        default=None,
+        description="The value of the heuristic solution that was given to the solver as a hint, if any.",
+    )
+    time_to_first_solution: Optional[float] = Field(
+        default=None,
+        description="The time in seconds until the solver found its first solution, if it found one.",
+    )
+
+    @property
+    def value(self) -> int:
+        """
+        The total value of all packed items.
+        """
+        return sum(item.value for knapsack in self.knapsacks for item in knapsack)
+
+    @property
+    def gap(self) -> Optional[float]:
+        """
+        The relative optimality gap, i.e., how much better the optimal solution
+        could be at most, or None if there is no upper bound.
+        """
+        if self.upper_bound is None:
+            return None
+        if self.upper_bound <= 0:
+            return 0.0
+        return max(0.0, (self.upper_bound - self.value) / self.upper_bound)
 
     # Some basic model validation to make sure there are no trivial errors.
     @model_validator(mode="after")
@@ -1,9 +1,60 @@
 import itertools
+import logging
 import math
-from typing import List
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Iterator, List, Optional, Sequence, Union
 
-from data_schema import Instance, Item, Solution
-from ortools.sat.python.cp_model import FEASIBLE, OPTIMAL, CpModel, CpSolver
+import numpy as np
+from cpsat_config import CpSatConfig, add_hints
+from data_schema import ColumnarInstance, Instance, Item, Solution
+from ortools.sat.python.cp_model import (
+    FEASIBLE,
+    OPTIMAL,
+    UNKNOWN,
+    CpModel,
+    CpSolverSolutionCallback,
+    IntVar,
+    LinearExpr,
+)
+from warm_start import WarmStart, assignment_value, warm_start_assignment
+
+# Number of item classes that are compared for the knapsack symmetry breaking.
+_LEX_MAX_CLASSES = 100
+# The item symmetry breaking is enabled by default if at least this share of
+# items has an identical twin. For few duplicates, the additional constraints
+# slowed down CP-SAT in our tests.
+_MIN_DUPLICATE_SHARE = 0.25
+
+
+class _ItemClass:
+    """
+    A group of items with the same value and weight.
+    """
+
+    def __init__(self, value: int, weight: int, indices: List[int]) -> None:
+        self.value = value
+        self.weight = weight
+        self.indices = indices  # indices of the items in the instance
+
+
+def _group_identical_items(instance: ColumnarInstance) -> List[_ItemClass]:
+    """
+    Group the items by their (value, weight) pairs.
+    """
+    if len(instance) == 0:
+        return []
+    pairs = np.stack([instance.values, instance.weights], axis=1)
+    unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind="stable")
+    splits = np.cumsum(np.bincount(inverse, minlength=len(unique_pairs)))[:-1]
+    return [
+        _ItemClass(int(value), int(weight), indices.tolist())
+        for (value, weight), indices in zip(unique_pairs, np.split(order, splits))
+    ]
 
 
 class MultiKnapsackSolver:
@@ -12,66 +63,307 @@ class MultiKnapsackSolver:
     (also the standard knapsack problem, if only one capacity is used).
 
     Attributes:
-    - instance (Instance): The multi-knapsack instance
-        - items (List[Item]): a list of Item objects representing the items to be packed.
+    - instance (ColumnarInstance): The multi-knapsack instance
+        - values (np.ndarray): the values of the items to be packed.
+        - weights (np.ndarray): the weights of the items to be packed.
         - capacities (List[int]): a list of integers representing the capacities of the knapsacks.
     - model (CpModel): a CpModel object representing the constraint programming model.
     - solver (CpSolver): a CpSolver object representing the constraint programming solver.
+    - item_classes (List[_ItemClass]): the groups of identical items.
+    - x (List[List[BoolVar]]): x[i][j] is true iff item i is packed into knapsack j.
+    - build_time (float): the time in seconds for building the model.
+    - solve_time (float): the time in seconds of the last solver call.
+    - hint_value (Optional[int]): the value of the solution hint, if any.
+    - hint_time (float): the time in seconds for computing the solution hint.
     """
 
-    def __init__(self, instance: Instance):
+    def __init__(
+        self,
+        instance: Union[Instance, ColumnarInstance],
+        logger: Optional[logging.Logger] = None,
+        config: Optional[CpSatConfig] = None,
+        break_item_symmetries: Optional[bool] = None,
+        break_knapsack_symmetries: bool = False,
+        warm_start: WarmStart = WarmStart.GREEDY,
+    ):
         """
         Initialize the solver with the given Multi-Knapsack instance.
 
         Args:
-        - instance (Instance): an Instance object representing the Multi-Knapsack instance.
+        - instance (Instance | ColumnarInstance): the Multi-Knapsack instance.
+          The `Item` objects of a ColumnarInstance are only created for packed items.
+        - logger (Logger): an optional logger for reporting build and solve times.
+        - config (CpSatConfig): the parameters for CP-SAT (workers, portfolio, hints, logging).
+        - break_item_symmetries (bool): forbid permutations of identical items.
+          By default, this is only done if the instance has many identical items.
+        - break_knapsack_symmetries (bool): forbid permutations of knapsacks with
+          the same capacity. This is off by default, as CP-SAT detects these
+          symmetries itself and the additional constraints were slower in our tests.
+        - warm_start (WarmStart): the heuristic for the solution hint, which is
+          only used if hints are enabled in the config.
         """
-        self.items = instance.items
+        self._logger = logger or logging.getLogger("MultiKnapsackSolver")
+        if isinstance(instance, Instance):
+            instance = ColumnarInstance.from_instance(instance)
+        self.instance = instance
         self.capacities = instance.capacities
+        weights = instance.weights.tolist()
+        values = instance.values.tolist()
+        self.config = config or CpSatConfig()
         self.model = CpModel()
-        self.solver = CpSolver()
-        self.solver.parameters.log_search_progress = True
-        self.x = []
-        for i in range(len(self.items)):
-            temp = []
-            for j in range(len(self.capacities)):
-                temp.append(self.model.NewBoolVar(f"x_{i}_{j}"))
-            self.x.append(temp)
-        
-        for j in range(len(self.capacities)):            
-            self.model.Add(sum(self.x[i][j] * self.items[i].weight for i in range(len(self.items))) <= self.capacities[j])
-        for i in range(len(self.items)):
-            self.model.Add(sum(self.x[i][j] for j in range(len(self.capacities))) <= 1)
-        self.model.Maximize(sum(sum(self.x[i][j] for j in range(len(self.capacities))) * self.items[i].value for i in range(len(self.items))))
-        # TODO: Implement me!
-
-
-
-    def solve(self, timelimit: float = math.inf) -> Solution:
+        self.solver = self.config.create_solver()
+        build_start = time.perf_counter()
+        num_knapsacks = len(self.capacities)
+        # x[i][j] == 1 iff item i is packed into knapsack j
+        self.x = [
+            [self.model.NewBoolVar(f"x_{i}_{j}") for j in range(num_knapsacks)]
+            for i in range(len(instance))
+        ]
+        # Building the expressions via WeightedSum over flat lists is much
+        # faster than Python's sum(), which creates a nested expression tree.
+        for j, capacity in enumerate(self.capacities):
+            column = [row[j] for row in self.x]
+            self.model.AddLinearConstraint(
+                LinearExpr.WeightedSum(column, weights), 0, capacity
+            )
+        for row in self.x:
+            self.model.AddAtMostOne(row)
+        self.model.Maximize(
+            LinearExpr.WeightedSum(
+                [x_ij for row in self.x for x_ij in row],
+                [v for v in values for _ in range(num_knapsacks)],
+            )
+        )
+        # Items with the same value and weight are interchangeable.
+        self.item_classes = _group_identical_items(instance)
+        if break_item_symmetries is None:
+            num_duplicates = len(instance) - len(self.item_classes)
+            break_item_symmetries = (
+                num_duplicates >= _MIN_DUPLICATE_SHARE * len(instance) > 0
+            )
+        if break_item_symmetries:
+            self._add_item_symmetry_breaking()
+        if break_knapsack_symmetries:
+            self._add_knapsack_symmetry_breaking()
+        self._hint = None
+        self.hint_value = None
+        self.hint_time = 0.0
+        if self.config.use_hints:
+            hint_start = time.perf_counter()
+            assignment = warm_start_assignment(instance, warm_start)
+            self.hint_time = time.perf_counter() - hint_start
+            self.add_hint(assignment)
+            self._hint = assignment
+            self.hint_value = assignment_value(instance, assignment)
+        self.build_time = time.perf_counter() - build_start
+        self.solve_time = 0.0
+        self._logger.info(
+            "Built model for %d item classes (%d items) in %.3fs.",
+            len(self.item_classes),
+            len(instance),
+            self.build_time,
+        )
+        if self.hint_value is not None:
+            self._logger.info(
+                "Computed %s hint with value %d in %.3fs.",
+                warm_start,
+                self.hint_value,
+                self.hint_time,
+            )
+
+    def add_hint(self, assignment: Sequence[int]) -> None:
+        """
+        Give CP-SAT a (feasible) solution to start from.
+
+        Args:
+        - assignment (Sequence[int]): the knapsack index for each item, or -1
+          if the item is not packed.
+        """
+        num_knapsacks = len(self.capacities)
+        assignment = [int(k) for k in assignment]
+        add_hints(
+            self.model,
+            (x_ij for row in self.x for x_ij in row),
+            (int(k == j) for k in assignment for j in range(num_knapsacks)),
+        )
+
+    def _add_item_symmetry_breaking(self):
+        """
+        Identical items can be swapped without changing the solution value.
+        Within every class of identical items, we thus require the items to be
+        packed in order of the knapsack indices, with unpacked items last.
+        This is enforced via prefix sums: every prefix of knapsacks must not
+        contain the next item of the class, unless it contains the previous one.
+        """
+        num_knapsacks = len(self.capacities)
+        for item_class in self.item_classes:
+            for i, i_next in zip(item_class.indices, item_class.indices[1:]):
+                for j in range(num_knapsacks):
+                    self.model.Add(
+                        LinearExpr.Sum(self.x[i_next][: j + 1])
+                        <= LinearExpr.Sum(self.x[i][: j + 1])
+                    )
+
+    def _add_knapsack_symmetry_breaking(self):
+        """
+        Knapsacks with the same capacity are interchangeable. For every pair of
+        consecutive identical knapsacks, we require the vector of the number
+        of packed items per class of the first one to be lexicographically
+        greater or equal than that of the second one. These counts do not
+        change when identical items are swapped, so this is compatible with
+        the item symmetry breaking.
+        Only the first `_LEX_MAX_CLASSES` classes are compared to keep the
+        model small (comparing a prefix is still valid).
+        """
+        by_capacity = defaultdict(list)
+        for j, capacity in enumerate(self.capacities):
+            by_capacity[capacity].append(j)
+        item_classes = self.item_classes[:_LEX_MAX_CLASSES]
+        for knapsacks in by_capacity.values():
+            for j, k in zip(knapsacks, knapsacks[1:]):
+                # equal_so_far <=> the counts of all previous classes are equal
+                equal_so_far = None
+                for c, item_class in enumerate(item_classes):
+                    a = LinearExpr.Sum([self.x[i][j] for i in item_class.indices])
+                    b = LinearExpr.Sum([self.x[i][k] for i in item_class.indices])
+                    if equal_so_far is None:
+                        self.model.Add(a >= b)
+                    else:
+                        self.model.Add(a >= b).OnlyEnforceIf(equal_so_far)
+                    if c == len(item_classes) - 1:
+                        break
+                    equal = self.model.NewBoolVar(f"lex_eq_{c}_{j}_{k}")
+                    self.model.Add(a == b).OnlyEnforceIf(equal)
+                    if equal_so_far is None:
+                        self.model.Add(a != b).OnlyEnforceIf(equal.Not())
+                    else:
+                        self.model.AddImplication(equal, equal_so_far)
+                        self.model.Add(a != b).OnlyEnforceIf(
+                            [equal_so_far, equal.Not()]
+                        )
+                    equal_so_far = equal
+
+    def _decode(self, is_packed: Callable[[IntVar], bool]) -> List[List[Item]]:
+        """
+        Extract the packed items of each knapsack from an assignment.
+        """
+        knapsacks = [[] for _ in self.capacities]
+        for i, row in enumerate(self.x):
+            for j, x_ij in enumerate(row):
+                if is_packed(x_ij):
+                    knapsacks[j].append(self.instance.item(i))
+                    break  # an item can only be in one knapsack
+        return knapsacks
+
+    def solve(
+        self,
+        timelimit: float = math.inf,
+        on_solution: Optional[Callable[[Solution], None]] = None,
+    ) -> Solution:
         """
         Solve the Multi-Knapsack instance with the given time limit.
+        If the time limit is reached, the best solution found so far is
+        returned together with an upper bound (see `Solution.gap`).
 
         Args:
         - timelimit (float): time limit in seconds for the cp-sat solver.
+        - on_solution (Callable[[Solution], None]): an optional function that
+          is called with every improving solution found during the search.
 
         Returns:
         - Solution: a list of lists of Item objects representing the items packed in each knapsack
         """
-        status = self.solver.Solve(self.model)
-        assert status == OPTIMAL
-        
-        knapsacks = []
-        for j in range(len(self.capacities)):
-            sacks = []
-            for i in range(len(self.items)):
-                if(self.solver.Value(self.x[i][j]) == 1):
-                    sacks.append(self.items[i])
-            
-            knapsacks.append(sacks)
         # handle given time limit
         if timelimit <= 0.0:
             return Solution(knapsacks=[])  # empty solution
-        elif timelimit < math.inf:
-            self.solver.parameters.max_time_in_seconds = timelimit
-        # TODO: Implement me!
-        return Solution(knapsacks= knapsacks)  # empty solution
+        # The limit has to be set before solving, and reset if no limit is given.
+        self.solver.parameters.max_time_in_seconds = timelimit
+        # The callback is always registered to measure the time to the first solution.
+        callback = _SolutionCallback(self, on_solution)
+        status = self.solver.Solve(self.model, callback)
+        self.solve_time = self.solver.WallTime()
+        self._logger.info(
+            "Solved model in %.3fs (model building took %.3fs) with status %s.",
+            self.solve_time,
+            self.build_time,
+            self.solver.StatusName(status),
+        )
+        statistics = {
+            "hint_value": self.hint_value,
+            "time_to_first_solution": callback.first_solution_time,
+        }
+        if status == OPTIMAL:
+            knapsacks = self._decode(self.solver.BooleanValue)
+            return Solution(
+                knapsacks=knapsacks,
+                upper_bound=self.solver.ObjectiveValue(),
+                **statistics,
+            )
+        if status == FEASIBLE:
+            knapsacks = self._decode(self.solver.BooleanValue)
+            return Solution(
+                knapsacks=knapsacks,
+                upper_bound=self.solver.BestObjectiveBound(),
+                **statistics,
+            )
+        # No solution (and no bound) was found in time, but the hint and
+        # empty knapsacks are always feasible.
+        assert status == UNKNOWN, "The model should never be infeasible."
+        if self._hint is not None:
+            knapsacks = [[] for _ in self.capacities]
+            for i, j in enumerate(self._hint.tolist()):
+                if j >= 0:
+                    knapsacks[j].append(self.instance.item(i))
+            return Solution(knapsacks=knapsacks, **statistics)
+        return Solution(knapsacks=[[] for _ in self.capacities], **statistics)
+
+    def iter_solutions(self, timelimit: float = math.inf) -> Iterator[Solution]:
+        """
+        Yield every improving solution as soon as it is found. The search runs
+        in a background thread and is stopped if the iteration is aborted.
+        The last yielded solution is the final one, including its upper bound.
+        """
+        solutions = queue.Queue()
+        done = object()  # marks the end of the search
+
+        def search():
+            try:
+                solutions.put(self.solve(timelimit, on_solution=solutions.put))
+            finally:
+                solutions.put(done)
+
+        thread = threading.Thread(target=search, daemon=True)
+        thread.start()
+        try:
+            while (solution := solutions.get()) is not done:
+                yield solution
+        finally:
+            self.solver.StopSearch()
+            thread.join()
+
+
+class _SolutionCallback(CpSolverSolutionCallback):
+    """
+    Records the time of the first solution and passes every improving
+    solution found by CP-SAT to an optional user function.
+    """
+
+    def __init__(
+        self,
+        solver: MultiKnapsackSolver,
+        on_solution: Optional[Callable[[Solution], None]] = None,
+    ) -> None:
+        super().__init__()
+        self._solver = solver
+        self._on_solution = on_solution
+        self.first_solution_time: Optional[float] = None
+
+    def on_solution_callback(self) -> None:
+        if self.first_solution_time is None:
+            self.first_solution_time = self.WallTime()
+        if self._on_solution is None:
+            return
+        knapsacks = self._solver._decode(self.BooleanValue)
+        self._on_solution(
+            Solution(knapsacks=knapsacks, upper_bound=self.BestObjectiveBound())
+        )
@@ -3,20 +3,17 @@ This module contains test cases for the MultiKnapsackSolver class in solver.py.
 It tests the correctness of the solution returned by the solver for different instances.
 """
 
-import json
 import os
 
 from _alglab_utils import CHECK, main, mandatory_testcase
-from solution import Instance, MultiKnapsackSolver, Solution
+from data_schema import ColumnarInstance
+from solution import MultiKnapsackSolver, Solution
 
 INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
 
 
 def solve_instance_and_check_solution(filename: str, solution_score: int):
-    instance = None
-    with open(os.path.join(INSTANCE_DIR, filename)) as f:
-        jdata = json.load(f)
-        instance = Instance.from_dict(jdata)
+    instance = ColumnarInstance.from_json_file(os.path.join(INSTANCE_DIR, filename))
     multi_knapsack = MultiKnapsackSolver(instance)
     solution = multi_knapsack.solve()
 
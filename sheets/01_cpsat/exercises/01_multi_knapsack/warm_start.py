@@ -0,0 +1,150 @@
+"""
+Heuristic start solutions for the MultiKnapsackSolver.
+
+CP-SAT can spend its first seconds on large instances just to find a decent
+incumbent. A heuristic solution passed as a hint lets it start from a good
+solution right away. The heuristics return an assignment, i.e., the knapsack
+index for each item or -1 if the item is not packed.
+"""
+
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+from data_schema import ColumnarInstance
+
+# LP values above this threshold are considered to be integral.
+_LP_INTEGRALITY_TOLERANCE = 1e-6
+
+
+class WarmStart(Enum):
+    """
+    The heuristic that is used for the solution hint.
+    """
+
+    GREEDY = "greedy"  # Greedy by efficiency, very fast.
+    LP = "lp"  # Rounded LP relaxation, completed greedily. Slower, sometimes better.
+
+    def __str__(self):
+        return self.value
+
+
+def _efficiency_order(instance: ColumnarInstance) -> np.ndarray:
+    """
+    The indices of all items with a positive value, sorted by decreasing value
+    per weight. Items without weight come first (they are free).
+    """
+    values = instance.values.astype(np.float64)
+    weights = instance.weights.astype(np.float64)
+    efficiency = np.divide(
+        values, weights, out=np.full(len(instance), np.inf), where=weights > 0
+    )
+    order = np.argsort(-efficiency, kind="stable")
+    return order[instance.values[order] > 0]
+
+
+def greedy_assignment(
+    instance: ColumnarInstance, assignment: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Pack the items by decreasing efficiency (value per weight), each into the
+    first knapsack it fits into (first-fit decreasing).
+
+    Args:
+    - instance (ColumnarInstance): the multi-knapsack instance.
+    - assignment (np.ndarray): an optional feasible partial assignment, which
+      is kept and completed with the remaining items.
+
+    Returns:
+    - np.ndarray: the knapsack index for each item, or -1 if it is not packed.
+    """
+    num_knapsacks = len(instance.capacities)
+    if assignment is None:
+        assignment = np.full(len(instance), -1, dtype=np.int64)
+    else:
+        assignment = np.array(assignment, dtype=np.int64)
+    packed = assignment >= 0
+    remaining = np.array(instance.capacities, dtype=np.int64) - np.bincount(
+        assignment[packed], weights=instance.weights[packed], minlength=num_knapsacks
+    ).astype(np.int64)
+    if num_knapsacks == 0:
+        return assignment
+    weights = instance.weights
+    largest = remaining.max()
+    for i in _efficiency_order(instance):
+        if assignment[i] >= 0 or weights[i] > largest:
+            continue
+        j = int(np.argmax(remaining >= weights[i]))
+        assignment[i] = j
+        remaining[j] -= weights[i]
+        largest = remaining.max()
+    return assignment
+
+
+def lp_rounding_assignment(instance: ColumnarInstance) -> np.ndarray:
+    """
+    Solve the LP relaxation with GLOP, keep all items that are integrally
+    packed in the LP solution, and complete the assignment greedily.
+    The LP has a variable for every item and knapsack, so this is noticeably
+    slower than `greedy_assignment` on large instances.
+
+    Returns:
+    - np.ndarray: the knapsack index for each item, or -1 if it is not packed.
+    """
+    from ortools.linear_solver import pywraplp
+
+    lp = pywraplp.Solver.CreateSolver("GLOP")
+    num_knapsacks = len(instance.capacities)
+    values, weights = instance.values.tolist(), instance.weights.tolist()
+    x = [
+        [lp.NumVar(0.0, 1.0, f"x_{i}_{j}") for j in range(num_knapsacks)]
+        for i in range(len(instance))
+    ]
+    for j, capacity in enumerate(instance.capacities):
+        constraint = lp.Constraint(0.0, capacity)
+        for i, row in enumerate(x):
+            constraint.SetCoefficient(row[j], weights[i])
+    for row in x:
+        constraint = lp.Constraint(0.0, 1.0)
+        for x_ij in row:
+            constraint.SetCoefficient(x_ij, 1.0)
+    objective = lp.Objective()
+    for i, row in enumerate(x):
+        for x_ij in row:
+            objective.SetCoefficient(x_ij, values[i])
+    objective.SetMaximization()
+    if lp.Solve() not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        return greedy_assignment(instance)
+    fractional = np.array(
+        [[x_ij.solution_value() for x_ij in row] for row in x], dtype=np.float64
+    ).reshape(len(instance), num_knapsacks)
+    assignment = np.full(len(instance), -1, dtype=np.int64)
+    if num_knapsacks > 0:
+        best = fractional.argmax(axis=1)
+        integral = fractional[np.arange(len(instance)), best] >= (
+            1.0 - _LP_INTEGRALITY_TOLERANCE
+        )
+        assignment[integral] = best[integral]
+    return greedy_assignment(instance, assignment)
+
+
+def warm_start_assignment(
+    instance: ColumnarInstance, warm_start: WarmStart = WarmStart.GREEDY
+) -> np.ndarray:
+    """
+    Compute a start solution with the given heuristic. As the greedy solution
+    is cheap, the LP warm start returns it instead if it happens to be better.
+    """
+    greedy = greedy_assignment(instance)
+    if warm_start == WarmStart.LP:
+        rounded = lp_rounding_assignment(instance)
+        if assignment_value(instance, rounded) > assignment_value(instance, greedy):
+            return rounded
+    return greedy
+
+
+def assignment_value(instance: ColumnarInstance, assignment: np.ndarray) -> int:
+    """
+    The total value of the packed items of an assignment.
+    """
+    return int(instance.values[np.asarray(assignment) >= 0].sum())
@@ -1,39 +1,177 @@
+import contextlib
 import os
+import pathlib
+import queue
 import sqlite3
-from typing import List
+import threading
+from typing import Dict, Iterator, List, Tuple
 
+import numpy as np
 from database import Donor, Recipient, TransplantDatabase
 
+# Blood types in the order of the rows/columns of `_BLOOD_COMPATIBILITY`.
+_BLOOD_TYPES = ("A", "B", "AB", "O")
+# _BLOOD_COMPATIBILITY[d, r] is true iff blood type d can donate to blood type r.
+# The last row/column is used for unknown (or NULL) blood types. As in the SQL
+# query, donors of unknown blood type are never compatible, while 'O' donors
+# are compatible with any recipient, including those of unknown blood type.
+_BLOOD_COMPATIBILITY = np.array(
+    [
+        # A, B, AB, O, unknown
+        [1, 0, 1, 0, 0],  # A
+        [0, 1, 1, 0, 0],  # B
+        [0, 0, 1, 0, 0],  # AB
+        [1, 1, 1, 1, 1],  # O
+        [0, 0, 0, 0, 0],  # unknown
+    ],
+    dtype=bool,
+)
+
+
+# All compatible (donor, recipient) pairs. The statements below are kept as
+# constants, such that every connection can reuse its prepared statements.
+_COMPATIBLE_PAIRS = """
+    SELECT d.id, r.id
+    FROM donors AS d
+    JOIN recipients AS r ON d.tissue_type = r.tissue_type AND (
+        CASE
+            WHEN d.blood_type = 'A' THEN r.blood_type IN ('A', 'AB')
+            WHEN d.blood_type = 'B' THEN r.blood_type IN ('B', 'AB')
+            WHEN d.blood_type = 'AB' THEN r.blood_type = 'AB'
+            WHEN d.blood_type = 'O' THEN 1  -- 'O' can donate to any blood type
+            ELSE 0  -- Handle other cases if needed
+        END
+    )
+"""
+_SELECT_DONORS = "SELECT id FROM donors"
+_SELECT_RECIPIENTS = "SELECT id FROM recipients"
+_SELECT_COMPATIBLE_DONORS = _COMPATIBLE_PAIRS + "WHERE r.id = ?"
+_SELECT_COMPATIBLE_RECIPIENTS = _COMPATIBLE_PAIRS + "WHERE d.id = ?"
+_SELECT_PARTNER_DONORS = "SELECT id FROM donors WHERE represents = ?"
+_SELECT_PARTNER_RECIPIENT = """
+    SELECT r.id
+    FROM recipients r
+    JOIN donors d
+    ON r.id = d.represents
+    WHERE d.id = ?
+"""
+_SELECT_PARTNER_MAP = """
+    SELECT d.id, r.id
+    FROM donors AS d
+    JOIN recipients AS r ON r.id = d.represents
+"""
+
+# Covering indexes for the compatibility and partner queries, such that SQLite
+# does not need to scan the tables for every query.
+_CREATE_INDEXES = """
+    CREATE INDEX IF NOT EXISTS donors_types ON donors(tissue_type, blood_type);
+    CREATE INDEX IF NOT EXISTS recipients_types
+        ON recipients(tissue_type, blood_type);
+    CREATE INDEX IF NOT EXISTS donors_represents ON donors(represents);
+"""
+
+DEFAULT_POOL_SIZE = 8
+# Size of the memory-mapped region of the database file for every connection.
+_MMAP_SIZE = 256 * 2**20
+# Number of prepared statements cached by every connection.
+_CACHED_STATEMENTS = 32
+
+
+def create_indexes(path: str) -> None:
+    """
+    Add the indexes for the queries of `SqliteTransplantDatabase` to the
+    database file. The database classes never modify their input, so this has
+    to be done explicitly (`generate_instance.py` does it for new instances).
+    """
+    with contextlib.closing(sqlite3.connect(path)) as dbcon:
+        with dbcon:
+            dbcon.executescript(_CREATE_INDEXES)
+
 
 class SqliteTransplantDatabase(TransplantDatabase):
     """
     This is a concrete implementation of the TransplantDatabase interface,
     which fetches the data from an underlying sqlite3 database.
+
+    The database is only read, via a pool of read-only connections that can
+    be used from any thread. Hence, several threads (or solvers running in
+    threads) can query the same database object concurrently.
+
+    The file must not be written while the pool is open: there is no writable
+    connection, and the file is deliberately not switched to write-ahead
+    logging (WAL), as that would modify the input (see `create_indexes` for
+    the indexes, which are also not created on open). Without WAL, a writer in
+    another process would block the readers or be blocked by them.
     """
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, pool_size: int = DEFAULT_POOL_SIZE) -> None:
         super().__init__()
         if not os.path.exists(path):
             raise FileNotFoundError(f"File {path} does not exist!")
-        self.dbcon = sqlite3.connect(path)
+        assert pool_size > 0, "The pool needs at least one connection."
+        self.path = path
+        self._uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+        self._pool_size = pool_size
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._num_connections = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        dbcon = sqlite3.connect(
+            self._uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=_CACHED_STATEMENTS,
+        )
+        dbcon.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+        return dbcon
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection from the pool. New connections are opened until
+        the pool is full, afterwards we wait for a connection to be returned.
+        """
+        try:
+            dbcon = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_connect = self._num_connections < self._pool_size
+                if can_connect:
+                    self._num_connections += 1
+            dbcon = self._connect() if can_connect else self._pool.get()
+        try:
+            yield dbcon
+        finally:
+            self._pool.put(dbcon)
+
+    def _query(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        with self._connection() as dbcon:
+            return dbcon.execute(sql, parameters).fetchall()
+
+    def close(self) -> None:
+        """
+        Close all connections that are currently not in use.
+        """
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._num_connections -= 1
 
     def get_all_donors(self) -> List[Donor]:
         """
         Get all registered donors from the database.
         """
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute("SELECT id, represents FROM donors")
-        return [Donor(id=row["id"]) for row in cur.fetchall()]
+        return [Donor(id=row[0]) for row in self._query(_SELECT_DONORS)]
 
     def get_all_recipients(self) -> List[Recipient]:
         """
         Get all recipients from the database.
         """
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute("SELECT id FROM recipients")
-        return [Recipient(id=row["id"]) for row in cur.fetchall()]
+        return [Recipient(id=row[0]) for row in self._query(_SELECT_RECIPIENTS)]
 
     def get_compatible_donors(self, recipient: Recipient) -> List[Donor]:
         """
@@ -43,27 +181,8 @@ class SqliteTransplantDatabase(TransplantDatabase):
         This is calculated using a SQL query, using blood types and tissue types
         from the database schema.
         """
-
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute(
-            """
-            SELECT d.id
-            FROM donors AS d
-            JOIN recipients AS r ON d.tissue_type = r.tissue_type AND (
-                CASE
-                    WHEN d.blood_type = 'A' THEN r.blood_type IN ('A', 'AB')
-                    WHEN d.blood_type = 'B' THEN r.blood_type IN ('B', 'AB')
-                    WHEN d.blood_type = 'AB' THEN r.blood_type = 'AB'
-                    WHEN d.blood_type = 'O' THEN 1  -- 'O' can donate to any blood type
-                    ELSE 0  -- Handle other cases if needed
-                END
-            )
-            WHERE r.id = ?
-            """,
-            (int(recipient.id),),
-        )
-        return [Donor(id=row["id"]) for row in cur.fetchall()]
+        rows = self._query(_SELECT_COMPATIBLE_DONORS, (int(recipient.id),))
+        return [Donor(id=row[0]) for row in rows]
 
     def get_compatible_recipients(self, donor: Donor) -> List[Recipient]:
         """
@@ -73,27 +192,167 @@ class SqliteTransplantDatabase(TransplantDatabase):
         This is calculated using a SQL query, using blood types and tissue types
         from the database schema.
         """
+        rows = self._query(_SELECT_COMPATIBLE_RECIPIENTS, (int(donor.id),))
+        return [Recipient(id=row[1]) for row in rows]
+
+    def get_partner_donors(self, recipient: Recipient) -> List[Donor]:
+        """
+        For a given recipient, find the associated representative donor(s).
+        Even if only one donor is registered as the partner of the given
+        donor, a list is returned.
+        """
+        rows = self._query(_SELECT_PARTNER_DONORS, (int(recipient.id),))
+        return [Donor(id=row[0]) for row in rows]
+
+    def get_partner_recipient(self, donor: Donor) -> Recipient:
+        """
+        For a given donor, find the represented recipient.
+        """
+        rows = self._query(_SELECT_PARTNER_RECIPIENT, (int(donor.id),))
+        return Recipient(id=rows[0][0])
 
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute(
-            """
-            SELECT r.id
-            FROM donors AS d
-            JOIN recipients AS r ON d.tissue_type = r.tissue_type AND (
-                CASE
-                    WHEN d.blood_type = 'A' THEN r.blood_type IN ('A', 'AB')
-                    WHEN d.blood_type = 'B' THEN r.blood_type IN ('B', 'AB')
-                    WHEN d.blood_type = 'AB' THEN r.blood_type = 'AB'
-                    WHEN d.blood_type = 'O' THEN 1  -- 'O' can donate to any blood type
-                    ELSE 0  -- Handle other cases if needed
-                END
+    def get_compatibility_edges(self) -> List[Tuple[Donor, Recipient]]:
+        """
+        Get all pairs of compatible donors and recipients with a single query.
+        """
+        donors, recipients = {}, {}
+        return [
+            (
+                donors.setdefault(donor_id, Donor(id=donor_id)),
+                recipients.setdefault(recipient_id, Recipient(id=recipient_id)),
             )
-            WHERE d.id = ?
-            """,
-            (int(donor.id),),
+            for donor_id, recipient_id in self._query(_COMPATIBLE_PAIRS)
+        ]
+
+    def get_partner_map(self) -> Dict[Donor, Recipient]:
+        """
+        Get the represented recipient of every donor with a single query.
+        """
+        return {
+            Donor(id=donor_id): Recipient(id=recipient_id)
+            for donor_id, recipient_id in self._query(_SELECT_PARTNER_MAP)
+        }
+
+
+class CachedTransplantDatabase(TransplantDatabase):
+    """
+    An in-memory implementation of the TransplantDatabase interface.
+    Both tables are loaded from the sqlite3 database once, and the
+    compatibility of all donor/recipient pairs is computed as a single boolean
+    matrix with NumPy. Afterwards, every method is answered from in-memory
+    indexes, which is much faster than a SQL query per call if the solvers
+    query the database in a loop.
+    The database is assumed not to change after loading.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        if not os.path.exists(path):
+            msg = f"File {path} does not exist!"
+            raise FileNotFoundError(msg)
+        self.path = path
+        with contextlib.closing(sqlite3.connect(path)) as dbcon:
+            donor_rows = dbcon.execute(
+                "SELECT id, represents, blood_type, tissue_type FROM donors"
+            ).fetchall()
+            recipient_rows = dbcon.execute(
+                "SELECT id, blood_type, tissue_type FROM recipients"
+            ).fetchall()
+        self._donors = [Donor(id=row[0]) for row in donor_rows]
+        self._recipients = [Recipient(id=row[0]) for row in recipient_rows]
+        recipient_by_id = {recipient.id: recipient for recipient in self._recipients}
+
+        # compatible[d, r] is true iff the d-th donor can donate to the r-th recipient
+        self.compatibility_matrix = self._compatibility_matrix(
+            [(row[2], row[3]) for row in donor_rows],
+            [(row[1], row[2]) for row in recipient_rows],
+        )
+        donor_idx, recipient_idx = np.nonzero(self.compatibility_matrix)
+        self._compatible_recipients: Dict[Donor, List[Recipient]] = {
+            donor: [] for donor in self._donors
+        }
+        self._compatible_donors: Dict[Recipient, List[Donor]] = {
+            recipient: [] for recipient in self._recipients
+        }
+        for d, r in zip(donor_idx.tolist(), recipient_idx.tolist()):
+            self._compatible_recipients[self._donors[d]].append(self._recipients[r])
+            self._compatible_donors[self._recipients[r]].append(self._donors[d])
+
+        self._partner_donors: Dict[Recipient, List[Donor]] = {
+            recipient: [] for recipient in self._recipients
+        }
+        self._partner_recipient: Dict[Donor, Recipient] = {}
+        for donor, row in zip(self._donors, donor_rows):
+            recipient = recipient_by_id.get(row[1])
+            if recipient is not None:
+                self._partner_donors[recipient].append(donor)
+                self._partner_recipient[donor] = recipient
+
+    @staticmethod
+    def _compatibility_matrix(
+        donors: List[tuple], recipients: List[tuple]
+    ) -> np.ndarray:
+        """
+        Compute the compatibility of all pairs of (blood type, tissue type) of
+        the donors and recipients. Both types have to match, as in the SQL
+        query of `SqliteTransplantDatabase`.
+        """
+        blood_codes = {blood_type: i for i, blood_type in enumerate(_BLOOD_TYPES)}
+        unknown = len(_BLOOD_TYPES)
+        donor_blood = np.array(
+            [blood_codes.get(b, unknown) for b, _ in donors], dtype=np.int64
+        )
+        recipient_blood = np.array(
+            [blood_codes.get(b, unknown) for b, _ in recipients], dtype=np.int64
+        )
+        # Map the tissue types to integers. NULL never equals anything in SQL,
+        # so donors and recipients without tissue type get distinct codes.
+        tissue_codes = {}
+        donor_tissue = np.array(
+            [
+                tissue_codes.setdefault(t, len(tissue_codes)) if t is not None else -1
+                for _, t in donors
+            ],
+            dtype=np.int64,
+        )
+        recipient_tissue = np.array(
+            [
+                tissue_codes.setdefault(t, len(tissue_codes)) if t is not None else -2
+                for _, t in recipients
+            ],
+            dtype=np.int64,
+        )
+        donor_blood = donor_blood.reshape(-1, 1)
+        donor_tissue = donor_tissue.reshape(-1, 1)
+        return _BLOOD_COMPATIBILITY[donor_blood, recipient_blood] & (
+            donor_tissue == recipient_tissue
         )
-        return [Recipient(id=row["id"]) for row in cur.fetchall()]
+
+    def get_all_donors(self) -> List[Donor]:
+        """
+        Get all registered donors from the database.
+        """
+        return list(self._donors)
+
+    def get_all_recipients(self) -> List[Recipient]:
+        """
+        Get all recipients from the database.
+        """
+        return list(self._recipients)
+
+    def get_compatible_donors(self, recipient: Recipient) -> List[Donor]:
+        """
+        For a given recipient, get a list of all compatible donors,
+        that are registered in the database.
+        """
+        return list(self._compatible_donors.get(recipient, ()))
+
+    def get_compatible_recipients(self, donor: Donor) -> List[Recipient]:
+        """
+        For a given donor, get a list of all compatible recipients,
+        that are registered in the database.
+        """
+        return list(self._compatible_recipients.get(donor, ()))
 
     def get_partner_donors(self, recipient: Recipient) -> List[Donor]:
         """
@@ -101,31 +360,26 @@ class SqliteTransplantDatabase(TransplantDatabase):
         Even if only one donor is registered as the partner of the given
         donor, a list is returned.
         """
-
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute(
-            "SELECT id FROM donors WHERE represents = ?",
-            (int(recipient.id),),
-        )
-        return [Donor(id=row["id"]) for row in cur.fetchall()]
+        return list(self._partner_donors.get(recipient, ()))
 
     def get_partner_recipient(self, donor: Donor) -> Recipient:
         """
         For a given donor, find the represented recipient.
         """
+        return self._partner_recipient[donor]
 
-        cur = self.dbcon.cursor()
-        cur.row_factory = sqlite3.Row
-        cur.execute(
-            """
-            SELECT r.id
-            FROM recipients r
-            JOIN donors d
-            ON r.id = d.represents
-            WHERE d.id = ?
-            """,
-            (int(donor.id),),
-        )
-        row = cur.fetchone()
-        return Recipient(id=row["id"])
+    def get_compatibility_edges(self) -> List[Tuple[Donor, Recipient]]:
+        """
+        Get all pairs of compatible donors and recipients.
+        """
+        return [
+            (donor, recipient)
+            for donor, recipients in self._compatible_recipients.items()
+            for recipient in recipients
+        ]
+
+    def get_partner_map(self) -> Dict[Donor, Recipient]:
+        """
+        Get the represented recipient of every donor.
+        """
+        return dict(self._partner_recipient)
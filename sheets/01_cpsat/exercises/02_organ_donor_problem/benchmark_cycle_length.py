@@ -0,0 +1,69 @@
+"""
+Compare the cycle formulation with the position-indexed edge formulation
+(PIEF) for increasing maximal cycle lengths. The number of cycles grows
+exponentially with the length, while PIEF only grows polynomially.
+
+Usage: python3 benchmark_cycle_length.py --lengths 2 3 4 5 6
+       [--solver cycle pief] [--instances instances/200.db] [--timelimit 60]
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from _db_impl import CachedTransplantDatabase
+from cpsat_config import CpSatConfig
+from solution_pief import PositionIndexedCrossoverTransplantSolver
+from solution_small_cycles import CycleLimitingCrossoverTransplantSolver
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
+
+SOLVERS = {
+    "cycle": CycleLimitingCrossoverTransplantSolver,
+    "pief": PositionIndexedCrossoverTransplantSolver,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the cycle formulation and PIEF for several cycle lengths."
+    )
+    parser.add_argument("--lengths", type=int, nargs="+", default=[2, 3, 4, 5, 6])
+    parser.add_argument(
+        "--solver", nargs="+", default=list(SOLVERS), choices=list(SOLVERS)
+    )
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--timelimit", type=float, default=60.0)
+    parser.add_argument(
+        "--instances",
+        nargs="+",
+        default=sorted(
+            glob.glob(os.path.join(INSTANCE_DIR, "*.db")),
+            key=lambda p: int(os.path.basename(p).split(".")[0]),
+        ),
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'instance':<10} {'length':>6} {'solver':<6} {'variables':>9} "
+        f"{'build[s]':>9} {'solve[s]':>9} {'donations':>9} {'bound':>7}"
+    )
+    config = CpSatConfig(num_workers=args.workers)
+    for path in args.instances:
+        database = CachedTransplantDatabase(path)
+        for length in args.lengths:
+            for solver_name in args.solver:
+                start = time.perf_counter()
+                solver = SOLVERS[solver_name](
+                    database, config=config, max_cycle_length=length
+                )
+                build_time = time.perf_counter() - start
+                solution = solver.optimize(args.timelimit)
+                print(
+                    f"{os.path.basename(path):<10} {length:>6} {solver_name:<6} "
+                    f"{len(solver.model.Proto().variables):>9} {build_time:>9.3f} "
+                    f"{solver.solver.WallTime():>9.3f} {len(solution.donations):>9} "
+                    f"{solver.solver.BestObjectiveBound():>7.0f}",
+                    flush=True,
+                )
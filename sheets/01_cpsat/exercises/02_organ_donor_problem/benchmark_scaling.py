@@ -0,0 +1,98 @@
+"""
+Benchmark the crossover transplant solvers on synthetic instances of growing
+size (see generate_instance.py) and report the build time, the solve time,
+and the peak memory usage.
+
+Every run is executed in a fresh process, such that the peak memory of one
+run does not hide that of the next one.
+
+Usage: python3 benchmark_scaling.py --sizes 100 1000 10000
+       [--solver basic cycle-limiting] [--directory /tmp/instances]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from _db_impl import CachedTransplantDatabase
+from cpsat_config import CpSatConfig
+from generate_instance import generate_instance
+from solution_basic import CrossoverTransplantSolver
+from solution_small_cycles import CycleLimitingCrossoverTransplantSolver
+
+SOLVERS = {
+    "basic": CrossoverTransplantSolver,
+    "cycle-limiting": CycleLimitingCrossoverTransplantSolver,
+}
+
+
+def _peak_memory_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def run(path: str, solver_name: str, num_workers: int, timelimit: float) -> Dict:
+    """
+    Build and solve a single instance. Meant to be run in a fresh process.
+    """
+    start = time.perf_counter()
+    database = CachedTransplantDatabase(path)
+    solver = SOLVERS[solver_name](database, config=CpSatConfig(num_workers=num_workers))
+    build_time = time.perf_counter() - start
+    solution = solver.optimize(timelimit)
+    return {
+        "edges": len(database.get_compatibility_edges()),
+        "build_time": build_time,
+        "solve_time": solver.solver.WallTime(),
+        "donations": len(solution.donations),
+        "memory": _peak_memory_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the transplant solvers on growing synthetic instances."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 200, 500, 1000, 2000, 5000, 10000]
+    )
+    parser.add_argument(
+        "--solver", nargs="+", default=list(SOLVERS), choices=list(SOLVERS)
+    )
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--timelimit", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--directory",
+        default=None,
+        help="Where to store the generated instances (default: a temporary directory).",
+    )
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp(prefix="transplant_instances_")
+    os.makedirs(directory, exist_ok=True)
+    print(
+        f"{'size':>6} {'edges':>9} {'solver':<15} {'build[s]':>9} {'solve[s]':>9} "
+        f"{'donations':>9} {'memory[MB]':>10}"
+    )
+    for size in args.sizes:
+        path = os.path.join(directory, f"{size}_seed{args.seed}.db")
+        if not os.path.exists(path):
+            generate_instance(path, size, seed=args.seed)
+        for solver_name in args.solver:
+            with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+                result = pool.apply(
+                    run, (path, solver_name, args.workers, args.timelimit)
+                )
+            print(
+                f"{size:>6} {result['edges']:>9} {solver_name:<15} "
+                f"{result['build_time']:>9.3f} {result['solve_time']:>9.3f} "
+                f"{result['donations']:>9} {result['memory']:>10.1f}",
+                flush=True,
+            )
@@ -0,0 +1,91 @@
+"""
+Benchmark the time to optimality of the crossover transplant solvers for
+different numbers of CP-SAT workers (and search portfolios) on the bundled
+instances.
+
+Usage: python3 benchmark_workers.py --workers 1 2 4 8 --portfolio default core
+       [--solver basic cycle-limiting] [--instances instances/200.db] [--sqlite]
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from _db_impl import CachedTransplantDatabase, SqliteTransplantDatabase
+from cpsat_config import CpSatConfig, Portfolio
+from solution_basic import CrossoverTransplantSolver
+from solution_small_cycles import CycleLimitingCrossoverTransplantSolver
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
+
+SOLVERS = {
+    "basic": CrossoverTransplantSolver,
+    "cycle-limiting": CycleLimitingCrossoverTransplantSolver,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sweep the number of CP-SAT workers on the transplant instances."
+    )
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    parser.add_argument(
+        "--portfolio",
+        type=Portfolio,
+        nargs="+",
+        default=[Portfolio.DEFAULT],
+        choices=list(Portfolio),
+    )
+    parser.add_argument(
+        "--solver", nargs="+", default=list(SOLVERS), choices=list(SOLVERS)
+    )
+    parser.add_argument("--no-hints", action="store_true", help="Disable hints.")
+    parser.add_argument("--timelimit", type=float, default=60.0)
+    parser.add_argument(
+        "--sqlite",
+        action="store_true",
+        help="Query the sqlite database directly instead of loading it into memory.",
+    )
+    parser.add_argument(
+        "--instances",
+        nargs="+",
+        default=sorted(
+            glob.glob(os.path.join(INSTANCE_DIR, "*.db")),
+            key=lambda p: int(os.path.basename(p).split(".")[0]),
+        ),
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'instance':<10} {'solver':<15} {'portfolio':<10} {'workers':>7} "
+        f"{'build[s]':>9} {'solve[s]':>9} {'speedup':>8} {'donations':>9}"
+    )
+    for path in args.instances:
+        if args.sqlite:
+            database = SqliteTransplantDatabase(path)
+        else:
+            database = CachedTransplantDatabase(path)
+        for solver_name in args.solver:
+            for portfolio in args.portfolio:
+                baseline = None
+                for num_workers in args.workers:
+                    config = CpSatConfig(
+                        num_workers=num_workers,
+                        portfolio=portfolio,
+                        use_hints=not args.no_hints,
+                    )
+                    start = time.perf_counter()
+                    solver = SOLVERS[solver_name](database, config=config)
+                    build_time = time.perf_counter() - start
+                    solution = solver.optimize(args.timelimit)
+                    solve_time = solver.solver.WallTime()
+                    baseline = baseline or solve_time
+                    print(
+                        f"{os.path.basename(path):<10} {solver_name:<15} {portfolio!s:<10} "
+                        f"{num_workers:>7} {build_time:>9.3f} {solve_time:>9.3f} "
+                        f"{baseline / solve_time:>8.2f} {len(solution.donations):>9}",
+                        flush=True,
+                    )
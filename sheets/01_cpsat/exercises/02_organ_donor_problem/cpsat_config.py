@@ -0,0 +1,91 @@
+"""
+A shared configuration for the CP-SAT solvers of this sheet.
+
+CP-SAT runs a portfolio of different search strategies in parallel, one per
+worker. The number of workers and the composition of the portfolio have a
+large influence on the time to optimality, so we make them configurable in a
+single place instead of creating bare `CpSolver()` objects everywhere.
+
+Every exercise is a self-contained directory whose modules import each other
+by name, so this file is copied into each of them (like `_alglab_utils.py`).
+Keep the copies identical.
+"""
+
+import typing
+from enum import Enum
+
+from ortools.sat.python.cp_model import CpModel, CpSolver, IntVar
+from pydantic import BaseModel, Field
+
+
+class Portfolio(Enum):
+    """
+    Different compositions of the parallel search portfolio.
+    """
+
+    DEFAULT = "default"  # CP-SAT's own choice, depending on the number of workers.
+    CORE = "core"  # Prefer core-based search, which is good at proving bounds.
+    FIXED = "fixed"  # Deterministic interleaved search, for reproducible benchmarks.
+
+    def __str__(self):
+        return self.value
+
+
+class CpSatConfig(BaseModel):
+    """
+    Parameters for the CP-SAT solver that are shared by all solvers.
+    """
+
+    num_workers: int = Field(
+        default=0,
+        ge=0,
+        description="Number of parallel search workers. 0 uses all available cores.",
+    )
+    portfolio: Portfolio = Field(
+        default=Portfolio.DEFAULT, description="Composition of the search portfolio."
+    )
+    use_hints: bool = Field(
+        default=True,
+        description="Give a heuristic solution to CP-SAT as a hint for the search.",
+    )
+    log_search_progress: bool = Field(
+        default=False, description="Let CP-SAT print its search progress."
+    )
+    random_seed: typing.Optional[int] = Field(
+        default=None, description="Seed for the randomized parts of the search."
+    )
+
+    def create_solver(self) -> CpSolver:
+        """
+        Create a new CpSolver with these parameters.
+        """
+        solver = CpSolver()
+        self.apply(solver)
+        return solver
+
+    def apply(self, solver: CpSolver) -> None:
+        """
+        Set the parameters of an existing CpSolver.
+        """
+        params = solver.parameters
+        params.num_workers = self.num_workers
+        params.log_search_progress = self.log_search_progress
+        if self.random_seed is not None:
+            params.random_seed = self.random_seed
+        if self.portfolio == Portfolio.CORE:
+            params.optimize_with_core = True
+        elif self.portfolio == Portfolio.FIXED:
+            params.interleave_search = True
+            params.use_lns_only = False
+
+
+def add_hints(
+    model: CpModel, variables: typing.Iterable[IntVar], values: typing.Iterable[int]
+) -> None:
+    """
+    Replace the solution hint of the model. A good hint lets CP-SAT start
+    with a decent incumbent instead of searching for a first solution.
+    """
+    model.ClearHints()
+    for var, value in zip(variables, values):
+        model.AddHint(var, value)
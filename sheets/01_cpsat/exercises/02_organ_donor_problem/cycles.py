@@ -0,0 +1,144 @@
+"""
+Enumeration of the short exchange cycles for the cycle formulation of the
+crossover transplant problem.
+
+The cycles are enumerated in their canonical rotation, i.e., starting at
+their smallest vertex (with respect to the order of the vertices in the
+graph), such that every cycle is found exactly once. The adjacency of the
+vertices is stored as bitsets (Python integers), which makes the test for
+closing a cycle and the choice of the next vertex cheap.
+"""
+
+from collections import defaultdict
+from typing import Dict, Hashable, Iterator, List, Mapping, Sequence, Tuple, TypeVar
+
+from data_schema import Donor, Recipient
+from database import TransplantDatabase
+
+T = TypeVar("T", bound=Hashable)
+
+
+def exchange_graph(
+    database: TransplantDatabase,
+) -> Dict[Recipient, Dict[Recipient, Donor]]:
+    """
+    For every recipient i, the recipients k that can receive an organ from a
+    donor of i, together with one such donor.
+    """
+    graph = {recipient: {} for recipient in database.get_all_recipients()}
+    partner = database.get_partner_map()
+    for donor, other in database.get_compatibility_edges():
+        recipient = partner.get(donor)
+        if recipient is not None and other != recipient:
+            graph[recipient].setdefault(other, donor)
+    return graph
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """
+    The indices of the set bits of a bitset, in increasing order.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def canonical_rotation(cycle: Sequence[T], order: Mapping[T, int]) -> Tuple[T, ...]:
+    """
+    Rotate the cycle such that the smallest vertex with respect to the
+    given order comes first.
+    """
+    first = min(range(len(cycle)), key=lambda n: order[cycle[n]])
+    return tuple(cycle[first:]) + tuple(cycle[:first])
+
+
+def enumerate_cycles(
+    graph: Mapping[T, Sequence[T]], max_length: int = 3
+) -> List[Tuple[T, ...]]:
+    """
+    Enumerate all simple directed cycles with at most `max_length` vertices.
+    Every cycle is returned once in its canonical rotation, i.e., starting at
+    the vertex that comes first in the iteration order of `graph`.
+    Cycles of length 2 and 3 are enumerated with dedicated loops; longer
+    cycles with a depth-first search.
+
+    Args:
+    - graph (Mapping): the successors of every vertex. Self-loops are ignored.
+    - max_length (int): the maximal number of vertices in a cycle.
+
+    Returns:
+    - List[Tuple]: the cycles, ordered by length.
+    """
+    nodes = list(graph)
+    index = {v: i for i, v in enumerate(nodes)}
+    for successors in graph.values():
+        for w in successors:
+            if w not in index:
+                index[w] = len(nodes)
+                nodes.append(w)
+    n = len(nodes)
+    succ = [0] * n
+    pred = [0] * n
+    for v, successors in graph.items():
+        i = index[v]
+        for w in successors:
+            j = index[w]
+            if i != j:
+                succ[i] |= 1 << j
+                pred[j] |= 1 << i
+    # higher[i]: the bitset of all vertices after vertex i
+    everything = (1 << n) - 1
+    higher = [everything & ~((2 << i) - 1) for i in range(n)]
+
+    cycles: List[Tuple[int, ...]] = []
+    if max_length >= 2:
+        for u in range(n):
+            cycles.extend((u, v) for v in _bits(succ[u] & pred[u] & higher[u]))
+    if max_length >= 3:
+        for u in range(n):
+            closing = pred[u] & higher[u]
+            for v in _bits(succ[u] & higher[u]):
+                cycles.extend((u, v, w) for w in _bits(succ[v] & closing & ~(1 << v)))
+    for length in range(4, max_length + 1):
+        for u in range(n):
+            closing = pred[u] & higher[u]
+            cycles.extend(_cycles_from(u, length, succ, closing, higher[u]))
+    return [tuple(nodes[i] for i in cycle) for cycle in cycles]
+
+
+def _cycles_from(
+    start: int, length: int, succ: List[int], closing: int, allowed: int
+) -> Iterator[Tuple[int, ...]]:
+    """
+    All cycles with exactly `length` vertices that start at `start` and
+    otherwise only use vertices in `allowed`. `closing` are the allowed
+    vertices with an edge back to `start`.
+    """
+    path = [start]
+
+    def extend(v: int, visited: int) -> Iterator[Tuple[int, ...]]:
+        candidates = succ[v] & allowed & ~visited
+        if len(path) == length - 1:
+            # the last vertex has to close the cycle
+            for w in _bits(candidates & closing):
+                yield (*path, w)
+            return
+        for w in _bits(candidates):
+            path.append(w)
+            yield from extend(w, visited | (1 << w))
+            path.pop()
+
+    yield from extend(start, 1 << start)
+
+
+def cycles_by_node(cycles: Sequence[Sequence[T]]) -> Dict[T, List[int]]:
+    """
+    An inverted index from every vertex to the indices of the cycles that
+    contain it.
+    """
+    index = defaultdict(list)
+    for c, cycle in enumerate(cycles):
+        for v in cycle:
+            index[v].append(c)
+    return dict(index)
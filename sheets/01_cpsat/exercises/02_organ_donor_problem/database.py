@@ -1,5 +1,5 @@
 from abc import ABC as AbstractClass
-from typing import List
+from typing import Dict, List, Tuple
 
 from data_schema import Donor, Recipient
 
@@ -53,3 +53,24 @@ class TransplantDatabase(AbstractClass):
         For a given donor, find the represented recipient.
         """
         raise NotImplementedError("This is an abstract class!")
+
+    def get_compatibility_edges(self) -> List[Tuple[Donor, Recipient]]:
+        """
+        Get all pairs of compatible donors and recipients at once, i.e., the
+        edges of the bipartite compatibility graph. Prefer this over calling
+        `get_compatible_recipients` for every donor.
+        """
+        return [
+            (donor, recipient)
+            for donor in self.get_all_donors()
+            for recipient in self.get_compatible_recipients(donor)
+        ]
+
+    def get_partner_map(self) -> Dict[Donor, Recipient]:
+        """
+        Get the represented recipient of every donor at once.
+        Prefer this over calling `get_partner_recipient` for every donor.
+        """
+        return {
+            donor: self.get_partner_recipient(donor) for donor in self.get_all_donors()
+        }
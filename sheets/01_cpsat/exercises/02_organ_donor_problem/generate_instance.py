@@ -0,0 +1,163 @@
+"""
+Generate synthetic instances for the crossover transplant problem, in the
+same sqlite3 format as the bundled instances (see `SqliteTransplantDatabase`).
+
+Every recipient registers with one or more donors, who are incompatible with
+the recipient (otherwise, they would not need an exchange). The blood types
+follow their frequency in the population and the tissue types are skewed,
+such that some are common and others rare.
+
+Usage: python3 generate_instance.py 10000 instances/10000_synthetic.db [--seed 0]
+"""
+
+import argparse
+import os
+import sqlite3
+from typing import Optional, Sequence
+
+import numpy as np
+from _db_impl import create_indexes
+
+BLOOD_TYPES = ("O", "A", "B", "AB")
+# Approximate frequencies of the blood types in the population.
+BLOOD_TYPE_FREQUENCIES = (0.44, 0.42, 0.10, 0.04)
+# Probability of a recipient registering with 1, 2, or 3 donors.
+DONORS_PER_RECIPIENT_FREQUENCIES = (0.80, 0.15, 0.05)
+DEFAULT_NUM_TISSUE_TYPES = 20
+
+# _CAN_DONATE[d, r] is true iff blood type d can donate to blood type r,
+# in the order of BLOOD_TYPES.
+_CAN_DONATE = np.array(
+    [
+        # O, A, B, AB
+        [1, 1, 1, 1],  # O
+        [0, 1, 0, 1],  # A
+        [0, 0, 1, 1],  # B
+        [0, 0, 0, 1],  # AB
+    ],
+    dtype=bool,
+)
+# Donors are resampled at most this often to make them incompatible.
+_MAX_RESAMPLING_ROUNDS = 100
+
+
+def _tissue_type_frequencies(num_tissue_types: int) -> np.ndarray:
+    """
+    Zipf-like frequencies: the t-th tissue type is 1/t as frequent as the first.
+    """
+    weights = 1.0 / np.arange(1, num_tissue_types + 1)
+    return weights / weights.sum()
+
+
+def generate_instance(
+    path: str,
+    num_recipients: int,
+    seed: Optional[int] = None,
+    num_tissue_types: int = DEFAULT_NUM_TISSUE_TYPES,
+    donors_per_recipient: Sequence[float] = DONORS_PER_RECIPIENT_FREQUENCIES,
+    overwrite: bool = False,
+) -> None:
+    """
+    Write a random instance to a new sqlite3 database.
+
+    Args:
+    - path (str): the file to create.
+    - num_recipients (int): the number of recipients (patients).
+    - seed (int): the seed for the random generator.
+    - num_tissue_types (int): the number of different tissue types.
+    - donors_per_recipient (Sequence[float]): the probability of a recipient
+      having 1, 2, ... donors.
+    - overwrite (bool): replace the file if it already exists.
+    """
+    if os.path.exists(path):
+        if not overwrite:
+            msg = f"File {path} already exists!"
+            raise FileExistsError(msg)
+        os.remove(path)
+    rng = np.random.default_rng(seed)
+    tissue_frequencies = _tissue_type_frequencies(num_tissue_types)
+
+    num_blood_types = len(BLOOD_TYPES)
+    recipient_blood = rng.choice(
+        num_blood_types, num_recipients, p=BLOOD_TYPE_FREQUENCIES
+    )
+    recipient_tissue = rng.choice(
+        num_tissue_types, num_recipients, p=tissue_frequencies
+    )
+    num_donors = 1 + rng.choice(
+        len(donors_per_recipient), num_recipients, p=donors_per_recipient
+    )
+    represents = np.repeat(np.arange(num_recipients), num_donors)
+
+    # Draw the donors and redraw those that are compatible with their recipient.
+    donor_blood = np.empty(len(represents), dtype=np.int64)
+    donor_tissue = np.empty(len(represents), dtype=np.int64)
+    todo = np.arange(len(represents))
+    for _ in range(_MAX_RESAMPLING_ROUNDS):
+        donor_blood[todo] = rng.choice(
+            num_blood_types, len(todo), p=BLOOD_TYPE_FREQUENCIES
+        )
+        donor_tissue[todo] = rng.choice(
+            num_tissue_types, len(todo), p=tissue_frequencies
+        )
+        r = represents[todo]
+        compatible = (donor_tissue[todo] == recipient_tissue[r]) & _CAN_DONATE[
+            donor_blood[todo], recipient_blood[r]
+        ]
+        todo = todo[compatible]
+        if len(todo) == 0:
+            break
+    # If a donor could not be made incompatible (e.g., for a single tissue type
+    # and an AB recipient), the pair is kept, as such pairs also exist.
+
+    with sqlite3.connect(path) as dbcon:
+        dbcon.executescript(
+            """
+            CREATE TABLE recipients (
+                id INTEGER PRIMARY KEY, blood_type TEXT, tissue_type INTEGER
+            );
+            CREATE TABLE donors (
+                id INTEGER PRIMARY KEY,
+                represents INTEGER,
+                blood_type TEXT,
+                tissue_type INTEGER
+            );
+            """
+        )
+        dbcon.executemany(
+            "INSERT INTO recipients VALUES (?, ?, ?)",
+            (
+                (i + 1, BLOOD_TYPES[b], int(t))
+                for i, (b, t) in enumerate(zip(recipient_blood, recipient_tissue))
+            ),
+        )
+        dbcon.executemany(
+            "INSERT INTO donors VALUES (?, ?, ?, ?)",
+            (
+                (j + 1, int(r) + 1, BLOOD_TYPES[b], int(t))
+                for j, (r, b, t) in enumerate(
+                    zip(represents, donor_blood, donor_tissue)
+                )
+            ),
+        )
+    dbcon.close()  # the context manager only commits
+    create_indexes(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic crossover transplant instance."
+    )
+    parser.add_argument("num_recipients", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--tissue-types", type=int, default=DEFAULT_NUM_TISSUE_TYPES)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+    generate_instance(
+        args.path,
+        args.num_recipients,
+        seed=args.seed,
+        num_tissue_types=args.tissue_types,
+        overwrite=args.overwrite,
+    )
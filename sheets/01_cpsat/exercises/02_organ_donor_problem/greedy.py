@@ -0,0 +1,75 @@
+"""
+A greedy heuristic for the crossover transplant problem. It is used to give
+the CP-SAT solvers a good solution to start from (a hint).
+"""
+
+from typing import List
+
+from cycles import exchange_graph
+from data_schema import Donation
+from database import TransplantDatabase
+
+
+def greedy_exchange_cycles(
+    database: TransplantDatabase, max_cycle_length: int = 3
+) -> List[List[Donation]]:
+    """
+    Greedily select disjoint exchange cycles, first all pairwise exchanges
+    and then (if allowed) exchanges between three pairs. Every cycle is
+    returned as the list of its donations.
+    """
+    graph = exchange_graph(database)
+    # Work on the indices of the recipients, as comparing and hashing the
+    # pydantic objects dominates the running time on large instances.
+    nodes = list(graph)
+    index = {v: n for n, v in enumerate(nodes)}
+    succ = [[index[k] for k in graph[v]] for v in nodes]
+    succ_set = [set(successors) for successors in succ]
+    used = [False] * len(nodes)
+    cycles = []
+
+    def take(*cycle: int):
+        cycles.append(
+            [
+                Donation(donor=graph[nodes[i]][nodes[k]], recipient=nodes[k])
+                for i, k in zip(cycle, cycle[1:] + cycle[:1])
+            ]
+        )
+        for i in cycle:
+            used[i] = True
+
+    def find_cycle(i: int) -> bool:
+        for k in succ[i]:
+            if not used[k] and i in succ_set[k]:
+                take(i, k)
+                return True
+        return False
+
+    def find_triangle(i: int) -> bool:
+        for k in succ[i]:
+            if used[k]:
+                continue
+            for m in succ[k]:
+                if m != i and not used[m] and i in succ_set[m]:
+                    take(i, k, m)
+                    return True
+        return False
+
+    for i in range(len(nodes)):
+        if not used[i]:
+            find_cycle(i)
+    if max_cycle_length >= 3:
+        for i in range(len(nodes)):
+            if not used[i]:
+                find_triangle(i)
+    return cycles
+
+
+def greedy_donations(
+    database: TransplantDatabase, max_cycle_length: int = 3
+) -> List[Donation]:
+    """
+    A greedy solution as list of donations.
+    """
+    cycles = greedy_exchange_cycles(database, max_cycle_length)
+    return [donation for cycle in cycles for donation in cycle]
@@ -0,0 +1,356 @@
+"""
+An incremental solver session for a changing pool of donors and recipients.
+
+The pool changes frequently (new pairs register, donors withdraw, test results
+change the compatibility), and rebuilding the whole model for every change is
+expensive. A session keeps the CP-SAT model of the edge formulation (see
+solution_basic.py) alive and only applies the changes to it:
+
+- new compatible pairs get a new variable, which is appended to the existing
+  constraints of its donor and recipients,
+- removed pairs, withdrawn donors and withdrawn recipients are not deleted,
+  but their variables are fixed to zero (and released again if they return).
+
+Every re-solve uses the previous matching as hint, such that CP-SAT only has
+to repair it, and prefers to keep the previous donations among all solutions
+with the maximal number of donations.
+"""
+
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from cpsat_config import CpSatConfig, add_hints
+from data_schema import Donation, Donor, Recipient, Solution
+from database import TransplantDatabase
+from greedy import greedy_donations
+from ortools.sat.python.cp_model import (
+    FEASIBLE,
+    OPTIMAL,
+    UNKNOWN,
+    CpModel,
+    IntVar,
+    LinearExpr,
+)
+from pydantic import BaseModel, Field
+
+_Pair = Tuple[Donor, Recipient]
+
+
+def _donations(pairs: Set[_Pair]) -> List[Donation]:
+    return [Donation(donor=donor, recipient=recipient) for donor, recipient in pairs]
+
+
+class PoolDelta(BaseModel):
+    """
+    A change of the donor/recipient pool.
+    """
+
+    added_pairs: List[_Pair] = Field(
+        default_factory=list,
+        description="New donors (or donors that now represent a different"
+        " recipient), together with the recipient they represent.",
+    )
+    withdrawn_donors: List[Donor] = Field(default_factory=list)
+    withdrawn_recipients: List[Recipient] = Field(default_factory=list)
+    added_edges: List[_Pair] = Field(
+        default_factory=list,
+        description="Donor/recipient pairs that became compatible.",
+    )
+    removed_edges: List[_Pair] = Field(
+        default_factory=list,
+        description="Donor/recipient pairs that are no longer compatible.",
+    )
+
+    def is_empty(self) -> bool:
+        return not (
+            self.added_pairs
+            or self.withdrawn_donors
+            or self.withdrawn_recipients
+            or self.added_edges
+            or self.removed_edges
+        )
+
+
+class MatchingUpdate(BaseModel):
+    """
+    The result of a re-optimization: the new solution and how it differs from
+    the previous one.
+    """
+
+    solution: Solution
+    added: List[Donation] = Field(description="Donations that are new.")
+    removed: List[Donation] = Field(description="Donations that were cancelled.")
+
+
+class IncrementalTransplantSession:
+    """
+    Keeps the CP-SAT model of the crossover transplant problem between
+    changes of the pool. Use `sync()` to load the changes from the database
+    (or `apply()` for explicit changes) and `optimize()` to re-solve.
+    """
+
+    def __init__(
+        self, database: TransplantDatabase, config: Optional[CpSatConfig] = None
+    ) -> None:
+        """
+        :param database: The organ donor/recipients database.
+        :param config: The parameters for CP-SAT (workers, portfolio, hints, logging).
+        """
+        self.database = database
+        self.config = config or CpSatConfig()
+        self.model = CpModel()
+        self.solver = self.config.create_solver()
+        # x[donor, recipient] == 1 iff the donor donates to the recipient.
+        # Variables are never deleted, but fixed to zero if inactive.
+        self.x: Dict[_Pair, IntVar] = {}
+        self.partner: Dict[Donor, Recipient] = {}
+        self._edges: Set[_Pair] = set()  # the currently compatible pairs
+        self._donors: Set[Donor] = set()
+        self._recipients: Set[Recipient] = set()
+        self._withdrawn_donors: Set[Donor] = set()
+        self._withdrawn_recipients: Set[Recipient] = set()
+        self._pairs_of_donor: Dict[Donor, List[_Pair]] = {}
+        self._pairs_of_recipient: Dict[Recipient, List[_Pair]] = {}
+        # indices of the constraints of every donor and recipient
+        self._donor_constraint: Dict[Donor, int] = {}
+        self._ingoing_constraint: Dict[Recipient, int] = {}
+        self._flow_constraint: Dict[Recipient, int] = {}
+        self.matching: Set[_Pair] = set()  # the donations of the last solution
+        self.apply(self._delta_from_database())
+        # the first solve starts from a greedy solution, later ones from the last one
+        self._hint: Set[_Pair] = set()
+        if self.config.use_hints:
+            self._hint = {
+                (d.donor, d.recipient) for d in greedy_donations(self.database)
+            }
+
+    def _active_donors(self) -> Set[Donor]:
+        return self._donors - self._withdrawn_donors
+
+    def _active_recipients(self) -> Set[Recipient]:
+        return self._recipients - self._withdrawn_recipients
+
+    def _delta_from_database(self) -> PoolDelta:
+        """
+        Compare the database with the state of the session.
+        """
+        partner = self.database.get_partner_map()
+        donors = set(self.database.get_all_donors())
+        recipients = set(self.database.get_all_recipients())
+        edges = set(self.database.get_compatibility_edges())
+        active_donors = self._active_donors()
+        return PoolDelta(
+            added_pairs=[
+                (donor, recipient)
+                for donor, recipient in partner.items()
+                if donor not in active_donors or self.partner.get(donor) != recipient
+            ],
+            withdrawn_donors=list(active_donors - donors),
+            withdrawn_recipients=list(self._active_recipients() - recipients),
+            added_edges=list(edges - self._edges),
+            removed_edges=list(self._edges - edges),
+        )
+
+    def sync(self) -> PoolDelta:
+        """
+        Load the changes of the pool from the database and apply them.
+        Returns the applied changes.
+        """
+        delta = self._delta_from_database()
+        self.apply(delta)
+        return delta
+
+    def apply(self, delta: PoolDelta) -> None:
+        """
+        Apply the changes of the pool to the model.
+        """
+        for donor, recipient in delta.added_pairs:
+            self._add_pair(donor, recipient)
+        self._withdrawn_donors.update(delta.withdrawn_donors)
+        self._withdrawn_recipients.update(delta.withdrawn_recipients)
+        self._edges.difference_update(delta.removed_edges)
+        for donor, recipient in delta.added_edges:
+            self._edges.add((donor, recipient))
+            if (donor, recipient) not in self.x:
+                self._add_variable(donor, recipient)
+        # update the domains of all affected variables
+        affected = set(delta.added_edges) | set(delta.removed_edges)
+        for donor, recipient in delta.added_pairs:
+            affected.update(self._pairs_of_donor.get(donor, ()))
+            affected.update(self._pairs_of_recipient.get(recipient, ()))
+        for donor in delta.withdrawn_donors:
+            affected.update(self._pairs_of_donor.get(donor, ()))
+        for recipient in delta.withdrawn_recipients:
+            affected.update(self._pairs_of_recipient.get(recipient, ()))
+        for pair in affected:
+            if pair in self.x:
+                self._update_domain(pair)
+
+    def _add_pair(self, donor: Donor, recipient: Recipient) -> None:
+        """
+        Register a (returning) donor with the recipient it represents. If the
+        donor represented another recipient before, its donations now need a
+        donation to the new recipient instead.
+        """
+        self._withdrawn_donors.discard(donor)
+        self._withdrawn_recipients.discard(recipient)
+        self._ensure_donor(donor)
+        self._ensure_recipient(recipient)
+        if self.partner.get(donor) != recipient:
+            pairs = self._pairs_of_donor[donor]
+            for pair in pairs:
+                for r, _ in self._flow_terms(pair):
+                    self._remove_term(self._flow_constraint[r], self.x[pair])
+            self.partner[donor] = recipient
+            for pair in pairs:
+                for r, coeff in self._flow_terms(pair):
+                    self._add_term(self._flow_constraint[r], self.x[pair], coeff)
+
+    def _ensure_donor(self, donor: Donor) -> None:
+        if donor not in self._donors:
+            self._donors.add(donor)
+            self._pairs_of_donor[donor] = []
+            # a donor donates at most once
+            self._donor_constraint[donor] = self.model.AddAtMostOne([]).Index()
+
+    def _ensure_recipient(self, recipient: Recipient) -> None:
+        if recipient not in self._recipients:
+            self._recipients.add(recipient)
+            self._pairs_of_recipient[recipient] = []
+            # a recipient receives at most once
+            self._ingoing_constraint[recipient] = self.model.AddAtMostOne([]).Index()
+            # exactly one partner donor donates iff the recipient receives
+            self._flow_constraint[recipient] = self.model.AddLinearConstraint(
+                LinearExpr.WeightedSum([], []), 0, 0
+            ).Index()
+
+    def _add_variable(self, donor: Donor, recipient: Recipient) -> None:
+        """
+        Create the variable for a new compatible pair and append it to the
+        existing constraints.
+        """
+        self._ensure_donor(donor)
+        self._ensure_recipient(recipient)
+        x = self.model.NewBoolVar(f"x_{donor.id}_{recipient.id}")
+        self.x[donor, recipient] = x
+        self._pairs_of_donor[donor].append((donor, recipient))
+        self._pairs_of_recipient[recipient].append((donor, recipient))
+        constraints = self.model.Proto().constraints
+        constraints[self._donor_constraint[donor]].at_most_one.literals.append(
+            x.Index()
+        )
+        constraints[self._ingoing_constraint[recipient]].at_most_one.literals.append(
+            x.Index()
+        )
+        for r, coeff in self._flow_terms((donor, recipient)):
+            self._add_term(self._flow_constraint[r], x, coeff)
+
+    def _flow_terms(self, pair: _Pair) -> List[Tuple[Recipient, int]]:
+        """
+        The coefficients of the pair's variable in the flow constraints: an
+        inflow to the recipient and an outflow from the donor's partner.
+        """
+        donor, recipient = pair
+        partner = self.partner.get(donor)
+        if partner == recipient:  # in- and outflow cancel out
+            return []
+        if partner is None:
+            return [(recipient, 1)]
+        return [(recipient, 1), (partner, -1)]
+
+    def _add_term(self, constraint: int, x: IntVar, coeff: int) -> None:
+        linear = self.model.Proto().constraints[constraint].linear
+        linear.vars.append(x.Index())
+        linear.coeffs.append(coeff)
+
+    def _remove_term(self, constraint: int, x: IntVar) -> None:
+        linear = self.model.Proto().constraints[constraint].linear
+        terms = [
+            (var, coeff)
+            for var, coeff in zip(linear.vars, linear.coeffs)
+            if var != x.Index()
+        ]
+        # the repeated fields can only be cleared and extended
+        linear.vars.clear()
+        linear.vars.extend(var for var, _ in terms)
+        linear.coeffs.clear()
+        linear.coeffs.extend(coeff for _, coeff in terms)
+
+    def _update_domain(self, pair: _Pair) -> None:
+        """
+        Fix the variable to zero if the pair is not (or no longer) available.
+        """
+        domain = self.model.Proto().variables[self.x[pair].Index()].domain
+        domain.clear()
+        domain.extend([0, 1 if self._is_active(pair) else 0])
+
+    def _is_active(self, pair: _Pair) -> bool:
+        donor, recipient = pair
+        return (
+            pair in self._edges
+            and donor not in self._withdrawn_donors
+            and recipient not in self._withdrawn_recipients
+        )
+
+    def _still_feasible(self, matching: Set[_Pair]) -> Set[_Pair]:
+        """
+        The donations of the matching that can still be made: the pairs that
+        are active, without the cycles that have lost a donation (or whose
+        donors now represent other recipients).
+        """
+        matching = {pair for pair in matching if self._is_active(pair)}
+        while True:
+            receiving = {recipient for _, recipient in matching}
+            # the number of donating partner donors of every recipient
+            donating = Counter(self.partner.get(donor) for donor, _ in matching)
+            feasible = {
+                (donor, recipient)
+                for donor, recipient in matching
+                if donating[recipient] == 1 and self.partner.get(donor) in receiving
+            }
+            if feasible == matching:
+                return matching
+            matching = feasible
+
+    def optimize(self, timelimit: float = math.inf) -> MatchingUpdate:
+        """
+        Re-solve the model, starting from the previous matching.
+        :param timelimit: The maximum time limit for the solver.
+        :return: The new solution and the changed donations.
+        """
+        # Maximize the number of donations and, among all maximum solutions,
+        # keep as many of the previous donations as possible.
+        weight = len(self.matching) + 1
+        self.model.ClearObjective()
+        self.model.Maximize(
+            LinearExpr.WeightedSum(
+                list(self.x.values()),
+                [weight + int(pair in self.matching) for pair in self.x],
+            )
+        )
+        if self.config.use_hints:
+            add_hints(
+                self.model,
+                self.x.values(),
+                (int(pair in self._hint) for pair in self.x),
+            )
+        if timelimit <= 0.0:
+            return MatchingUpdate(solution=Solution(donations=[]), added=[], removed=[])
+        self.solver.parameters.max_time_in_seconds = timelimit
+        status = self.solver.Solve(self.model)
+        if status == UNKNOWN:
+            # No solution within the time limit, keep what is left of the
+            # previous one.
+            matching = self._still_feasible(self.matching)
+        else:
+            assert status in (OPTIMAL, FEASIBLE)
+            matching = {
+                pair for pair, x in self.x.items() if self.solver.BooleanValue(x)
+            }
+        previous, self.matching, self._hint = self.matching, matching, matching
+        return MatchingUpdate(
+            solution=Solution(donations=_donations(matching)),
+            added=_donations(matching - previous),
+            removed=_donations(previous - matching),
+        )
@@ -0,0 +1,35 @@
+"""
+Add the covering indexes for the compatibility and partner queries of
+`SqliteTransplantDatabase` to existing instance files (new instances of
+`generate_instance.py` already have them). Without the indexes, every
+per-donor or per-recipient query scans the tables.
+
+The database classes never modify their input, so this is a one-time setup
+step that rewrites the given files. Git will show the instances as modified.
+
+Usage: python3 index_instances.py [instances/200.db ...]
+"""
+
+import argparse
+import glob
+import os
+
+from _db_impl import create_indexes
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Add the query indexes to crossover transplant instances."
+    )
+    parser.add_argument(
+        "instances",
+        nargs="*",
+        default=sorted(glob.glob(os.path.join(INSTANCE_DIR, "*.db"))),
+        help="Instance files (default: all bundled instances).",
+    )
+    args = parser.parse_args()
+    for path in args.instances:
+        create_indexes(path)
+        print(f"Indexed {path}")
@@ -1,48 +1,82 @@
 import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 
-import networkx as nx
-from data_schema import Donation, Solution
+from cpsat_config import CpSatConfig, add_hints
+from data_schema import Donation, Donor, Recipient, Solution
 from database import TransplantDatabase
-from ortools.sat.python.cp_model import FEASIBLE, OPTIMAL, CpModel, CpSolver
+from greedy import greedy_donations
+from ortools.sat.python.cp_model import (
+    FEASIBLE,
+    OPTIMAL,
+    UNKNOWN,
+    CpModel,
+    IntVar,
+    LinearExpr,
+)
 
 
 class CrossoverTransplantSolver:
-    def __init__(self, database: TransplantDatabase) -> None:
+    def __init__(
+        self, database: TransplantDatabase, config: Optional[CpSatConfig] = None
+    ) -> None:
         """
         Constructs a new solver instance, using the instance data from the given database instance.
+        The model only has a variable for every compatible (donor, recipient) pair,
+        which are only a small fraction of all pairs on larger instances.
         :param Database database: The organ donor/recipients database.
+        :param config: The parameters for CP-SAT (workers, portfolio, hints, logging).
         """
         self.database = database
-        donors = self.database.get_all_donors()
-        recipients = self.database.get_all_recipients()
+        self.config = config or CpSatConfig()
+        self.donors = self.database.get_all_donors()
+        self.recipients = self.database.get_all_recipients()
+        self.partner = self.database.get_partner_map()
 
         self.model = CpModel()
-        self.x = []
-        for i in range(len(recipients)):
-            temp = []
-            for j in range(len(donors)):
-                temp.append(self.model.NewBoolVar(f"x_{i}_{j}"))
-            self.x.append(temp)
-        print(1)
-        for i in range(len(recipients)):
-            partner_donors = self.database.get_partner_donors(recipient=recipients[i])
-            self.model.Add(sum(self.x[i][j] for j in range(len(donors))) <= 1)
-            self.model.Add(sum(self.x[i][j] for j in range(len(donors)) if donors[j] in partner_donors) <= 1)
-            #print(1.5)
-            ingoing_donations = sum(self.x[i][j] for j in range(len(donors)))
-            outgoing_donations = sum(self.x[k][j] for k in range(len(recipients)) for j in range(len(donors)) if donors[j] in partner_donors)
-            self.model.Add(ingoing_donations == outgoing_donations)
-        print(2)
-        for j in range(len(donors)):
-            compatible_donors = self.database.get_compatible_recipients(donors[j])
-            self.model.Add(sum(self.x[i][j] for i in range(len(recipients))) <= 1)
-            self.model.Add(sum(self.x[i][j] for i in range(len(recipients)) if recipients[i] not in compatible_donors) == 0)
-        print(3)
-        self.model.Maximize(sum(self.x[i][j] for i in range(len(recipients)) for j in range(len(donors))))
+        # x[donor, recipient] == 1 iff the donor donates to the recipient
+        self.x: Dict[Tuple[Donor, Recipient], IntVar] = {
+            (donor, recipient): self.model.NewBoolVar(f"x_{donor.id}_{recipient.id}")
+            for donor, recipient in self.database.get_compatibility_edges()
+        }
+        donations_of: Dict[Donor, List[IntVar]] = defaultdict(list)
+        ingoing: Dict[Recipient, List[IntVar]] = defaultdict(list)
+        # outgoing[r]: the donations of the partner donors of r
+        outgoing: Dict[Recipient, List[IntVar]] = defaultdict(list)
+        for (donor, recipient), x in self.x.items():
+            donations_of[donor].append(x)
+            ingoing[recipient].append(x)
+            if donor in self.partner:
+                outgoing[self.partner[donor]].append(x)
 
-        self.solver = CpSolver()
-        self.solver.parameters.log_search_progress = True
+        for donations in donations_of.values():
+            self.model.AddAtMostOne(donations)
+        for recipient in self.recipients:
+            self.model.AddAtMostOne(ingoing[recipient])
+            # exactly one partner donor donates iff the recipient receives
+            self.model.Add(
+                LinearExpr.Sum(ingoing[recipient])
+                == LinearExpr.Sum(outgoing[recipient])
+            )
+        self.model.Maximize(LinearExpr.Sum(list(self.x.values())))
 
+        # the greedy solution, if hints are used
+        self._hint_donations: List[Donation] = []
+        if self.config.use_hints:
+            self._add_greedy_hint()
+        self.solver = self.config.create_solver()
+
+    def _add_greedy_hint(self) -> None:
+        """
+        Use a greedy solution as a starting point for CP-SAT.
+        """
+        self._hint_donations = greedy_donations(self.database)
+        selected = {(d.donor, d.recipient) for d in self._hint_donations}
+        add_hints(
+            self.model,
+            self.x.values(),
+            (int(pair in selected) for pair in self.x),
+        )
 
     def optimize(self, timelimit: float = math.inf) -> Solution:
         """
@@ -50,16 +84,19 @@ class CrossoverTransplantSolver:
         :param timelimit: The maximum time limit for the solver.
         :return: A list of Donation objects representing the best solution, or None if no solution was found.
         """
-        status = self.solver.Solve(self.model)
-        assert status == OPTIMAL
-        
-        donations = []
-        for j in range(len(self.database.get_all_donors())):
-            for i in range(len(self.database.get_all_recipients())):
-                if self.solver.Value(self.x[i][j]) == 1:
-                    donations.append(Donation(donor=self.database.get_all_donors()[j], recipient=self.database.get_all_recipients()[i]))
         if timelimit <= 0.0:
             return Solution(donations=[])
-        if timelimit < math.inf:
-            self.solver.parameters.max_time_in_seconds = timelimit
+        # the time limit must be set before solving
+        self.solver.parameters.max_time_in_seconds = timelimit
+        status = self.solver.Solve(self.model)
+        if status == UNKNOWN:
+            # no solution within the time limit, but the hint is feasible
+            return Solution(donations=list(self._hint_donations))
+        assert status in (OPTIMAL, FEASIBLE)
+
+        donations = [
+            Donation(donor=donor, recipient=recipient)
+            for (donor, recipient), x in self.x.items()
+            if self.solver.BooleanValue(x)
+        ]
         return Solution(donations=donations)
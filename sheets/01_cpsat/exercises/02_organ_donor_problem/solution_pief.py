@@ -0,0 +1,194 @@
+"""
+A solver for the crossover transplant problem with long exchange cycles.
+
+The cycle formulation (see solution_small_cycles.py) needs a variable for
+every cycle, whose number grows exponentially with the maximal cycle length.
+The position-indexed edge formulation (PIEF) by Dickerson et al. (2016) only
+needs a variable for every edge, position in the cycle, and copy of the graph,
+so its size is polynomial in the maximal cycle length.
+
+For every vertex s, there is a copy of the exchange graph that only contains
+s and the vertices after s. A cycle is represented in the copy of its
+smallest vertex, with its k-th edge (counted from s) at position k.
+"""
+
+import math
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+from cpsat_config import CpSatConfig, add_hints
+from cycles import canonical_rotation, exchange_graph
+from data_schema import Donation, Recipient, Solution
+from database import TransplantDatabase
+from greedy import greedy_exchange_cycles
+from ortools.sat.python.cp_model import (
+    FEASIBLE,
+    OPTIMAL,
+    UNKNOWN,
+    CpModel,
+    IntVar,
+    LinearExpr,
+)
+
+# (copy, tail, head, position) with the vertices given by their index
+_EdgeKey = Tuple[int, int, int, int]
+
+
+def _distances(
+    start: int, neighbors: List[List[int]], allowed_from: int, limit: int
+) -> Dict[int, int]:
+    """
+    BFS distances from `start` up to `limit`, only using vertices with an
+    index of at least `allowed_from`.
+    """
+    distance = {start: 0}
+    queue = deque([start])
+    while queue:
+        v = queue.popleft()
+        if distance[v] == limit:
+            continue
+        for w in neighbors[v]:
+            if w >= allowed_from and w not in distance:
+                distance[w] = distance[v] + 1
+                queue.append(w)
+    return distance
+
+
+class PositionIndexedCrossoverTransplantSolver:
+    def __init__(
+        self,
+        database: TransplantDatabase,
+        config: Optional[CpSatConfig] = None,
+        max_cycle_length: int = 3,
+    ) -> None:
+        """
+        Constructs a new solver instance, using the instance data from the given database instance.
+        :param Database database: The organ donor/recipients database.
+        :param config: The parameters for CP-SAT (workers, portfolio, hints, logging).
+        :param max_cycle_length: The maximal number of pairs in an exchange cycle.
+        """
+        self.database = database
+        self.config = config or CpSatConfig()
+        self.max_cycle_length = max_cycle_length
+        # There is an edge i -> k if a donor of i is compatible with k.
+        self.graph = exchange_graph(self.database)
+        self.nodes: List[Recipient] = list(self.graph)
+        index = {v: i for i, v in enumerate(self.nodes)}
+        succ = [[index[w] for w in self.graph[v]] for v in self.nodes]
+        pred = [[] for _ in self.nodes]
+        for i, successors in enumerate(succ):
+            for j in successors:
+                pred[j].append(i)
+
+        self.model = CpModel()
+        self.x: Dict[_EdgeKey, IntVar] = {}
+        # all variables of edges into a vertex, over all copies and positions
+        ingoing: Dict[int, List[IntVar]] = defaultdict(list)
+        for s in range(len(self.nodes)):
+            self._add_copy(s, succ, pred, ingoing)
+        for variables in ingoing.values():
+            self.model.AddAtMostOne(variables)
+        self.model.Maximize(LinearExpr.Sum(list(self.x.values())))
+
+        # the greedy solution, if hints are used
+        self._hint_donations: List[Donation] = []
+        if self.config.use_hints:
+            self._add_greedy_hint()
+        self.solver = self.config.create_solver()
+        # The strength of PIEF is its LP relaxation, which CP-SAT only fully
+        # uses with the highest linearization level (much faster in our tests).
+        self.solver.parameters.linearization_level = 2
+
+    def _add_copy(
+        self,
+        s: int,
+        succ: List[List[int]],
+        pred: List[List[int]],
+        ingoing: Dict[int, List[IntVar]],
+    ) -> None:
+        """
+        Add the variables and flow constraints of the copy of vertex s.
+        An edge (i, j) can only be at position k if i can be reached from s
+        with k-1 edges and s can be reached from j with the remaining edges.
+        """
+        L = self.max_cycle_length
+        dist_from = _distances(s, succ, s, L - 1)
+        dist_to = _distances(s, pred, s, L - 1)
+        if not any(i in dist_from for i in pred[s] if i > s):
+            return  # no cycle starts at s
+        # in_at[i, k] / out_at[i, k]: edges into / out of i at position k
+        in_at: Dict[Tuple[int, int], List[IntVar]] = defaultdict(list)
+        out_at: Dict[Tuple[int, int], List[IntVar]] = defaultdict(list)
+        closing: List[IntVar] = []
+        for i, d_i in dist_from.items():
+            for j in succ[i]:
+                if j < s or j not in dist_to:
+                    continue
+                # positions with i reachable in k-1 steps and s in L-k steps
+                first = max(d_i + 1, 1 if i == s else 2)
+                last = L - dist_to[j] if j != s else L
+                if i == s:
+                    last = min(last, 1)
+                for k in range(first, last + 1):
+                    x = self.model.NewBoolVar(f"x_{s}_{i}_{j}_{k}")
+                    self.x[s, i, j, k] = x
+                    ingoing[j].append(x)
+                    out_at[i, k].append(x)
+                    if j == s:
+                        closing.append(x)
+                    else:
+                        in_at[j, k].append(x)
+        # a cycle leaves s at position 1 iff it returns to s
+        self.model.Add(LinearExpr.Sum(out_at[s, 1]) == LinearExpr.Sum(closing))
+        # the flow into a vertex at position k leaves it at position k+1
+        for (i, k), variables in in_at.items():
+            self.model.Add(
+                LinearExpr.Sum(variables)
+                == LinearExpr.Sum(out_at.get((i, k + 1), []))
+            )
+        for (i, k), variables in out_at.items():
+            if i != s and (i, k - 1) not in in_at:
+                self.model.Add(LinearExpr.Sum(variables) == 0)
+
+    def _add_greedy_hint(self) -> None:
+        """
+        Use a greedy selection of cycles as a starting point for CP-SAT.
+        """
+        index = {v: i for i, v in enumerate(self.nodes)}
+        selected = set()
+        for cycle in greedy_exchange_cycles(self.database, self.max_cycle_length):
+            recipients = [donation.recipient for donation in cycle]
+            if len(recipients) > self.max_cycle_length:
+                continue
+            self._hint_donations.extend(cycle)
+            rotated = [index[v] for v in canonical_rotation(recipients, index)]
+            s = rotated[0]
+            for k, (i, j) in enumerate(zip(rotated, rotated[1:] + rotated[:1])):
+                selected.add((s, i, j, k + 1))
+        add_hints(
+            self.model, self.x.values(), (int(key in selected) for key in self.x)
+        )
+
+    def optimize(self, timelimit: float = math.inf) -> Solution:
+        """
+        Solves the model and returns the best solution found within the time limit.
+        :param timelimit: The maximum time limit for the solver.
+        :return: The selected donations.
+        """
+        if timelimit <= 0.0:
+            return Solution(donations=[])
+        self.solver.parameters.max_time_in_seconds = timelimit
+        status = self.solver.Solve(self.model)
+        if status == UNKNOWN:
+            # no solution within the time limit, but the hint is feasible
+            return Solution(donations=list(self._hint_donations))
+        assert status in (OPTIMAL, FEASIBLE)
+
+        donations = []
+        for (_, i, j, _), x in self.x.items():
+            if self.solver.BooleanValue(x):
+                tail, head = self.nodes[i], self.nodes[j]
+                donations.append(
+                    Donation(donor=self.graph[tail][head], recipient=head)
+                )
+        return Solution(donations=donations)
@@ -1,59 +1,87 @@
 import math
-from collections import defaultdict
+from typing import List, Optional
 
-import networkx as nx
+from cpsat_config import CpSatConfig, add_hints
+from cycles import canonical_rotation, cycles_by_node, enumerate_cycles, exchange_graph
 from data_schema import Donation, Solution
 from database import TransplantDatabase
-from ortools.sat.python.cp_model import FEASIBLE, OPTIMAL, CpModel, CpSolver
+from greedy import greedy_exchange_cycles
+from ortools.sat.python.cp_model import (
+    FEASIBLE,
+    OPTIMAL,
+    UNKNOWN,
+    CpModel,
+    LinearExpr,
+)
 
 
 class CycleLimitingCrossoverTransplantSolver:
-    def __init__(self, database: TransplantDatabase) -> None:
+    def __init__(
+        self,
+        database: TransplantDatabase,
+        config: Optional[CpSatConfig] = None,
+        max_cycle_length: int = 3,
+    ) -> None:
         """
         Constructs a new solver instance, using the instance data from the given database instance.
         :param Database database: The organ donor/recipients database.
+        :param config: The parameters for CP-SAT (workers, portfolio, hints, logging).
+        :param max_cycle_length: The maximal number of pairs in an exchange cycle.
+            The number of cycles grows exponentially with this length.
         """
 
         self.database = database
+        self.config = config or CpSatConfig()
+        self.max_cycle_length = max_cycle_length
         self.donors = self.database.get_all_donors()
         self.recipients = self.database.get_all_recipients()
-        
+
         self.model = CpModel()
-        G = nx.DiGraph()
-        for i in self.recipients:
-            for k in self.recipients:
-                if i == k:
-                    continue
-                pdonors = set(self.database.get_partner_donors(i))
-                cdonors = set(self.database.get_compatible_donors(k))
-                if len(pdonors.intersection(cdonors)) > 0:
-                    G.add_edge(i, k)
-                    
-        self.cycles = [cycle for cycle in nx.simple_cycles(G, 3)]
-        self.y = [self.model.NewBoolVar(f"y_{cycle}") for cycle in self.cycles]
-        for v in G.nodes():
-            self.model.Add(sum(yi for yi, c in zip(self.y, self.cycles) if v in c) <= 1)
-        self.model.Maximize(sum(yi*len(cycle) for yi,cycle in zip(self.y, self.cycles)))
-        
-        self.solver = CpSolver()
+        # There is an edge i -> k if a donor of i is compatible with k.
+        self.graph = exchange_graph(self.database)
+        self.cycles = enumerate_cycles(self.graph, max_cycle_length)
+        self.y = [self.model.NewBoolVar(f"y_{c}") for c in range(len(self.cycles))]
+        # every recipient is in at most one of the selected cycles
+        for cycle_indices in cycles_by_node(self.cycles).values():
+            self.model.AddAtMostOne(self.y[c] for c in cycle_indices)
+        self.model.Maximize(
+            LinearExpr.WeightedSum(self.y, [len(cycle) for cycle in self.cycles])
+        )
+        # the greedy solution, if hints are used
+        self._hint_donations: List[Donation] = []
+        if self.config.use_hints:
+            self._add_greedy_hint()
+        self.solver = self.config.create_solver()
 
+    def _add_greedy_hint(self) -> None:
+        """
+        Use a greedy selection of cycles as a starting point for CP-SAT.
+        """
+        order = {recipient: n for n, recipient in enumerate(self.graph)}
+        cycles = greedy_exchange_cycles(self.database, self.max_cycle_length)
+        self._hint_donations = [donation for cycle in cycles for donation in cycle]
+        selected = {
+            canonical_rotation([donation.recipient for donation in cycle], order)
+            for cycle in cycles
+        }
+        add_hints(self.model, self.y, (int(cycle in selected) for cycle in self.cycles))
 
     def optimize(self, timelimit: float = math.inf) -> Solution:
+        if timelimit <= 0.0:
+            return Solution(donations=[])
+        # the time limit must be set before solving
+        self.solver.parameters.max_time_in_seconds = timelimit
         status = self.solver.Solve(self.model)
-        assert status == OPTIMAL
+        if status == UNKNOWN:
+            # no solution within the time limit, but the hint is feasible
+            return Solution(donations=list(self._hint_donations))
+        assert status in (OPTIMAL, FEASIBLE)
         
+        # The donor of every edge was captured with the exchange graph, so
+        # decoding does not need to query the database again.
         donations = []
-        for yi, cycle in zip(self.y, self.cycles):
-            if self.solver.Value(yi) == 1:
-                for n in range(len(cycle)):
-                    if n == len(cycle)-1:
-                        donations.append(Donation(donor=list(set(self.database.get_partner_donors(cycle[len(cycle)-1])).intersection(set(self.database.get_compatible_donors(cycle[0]))))[0] , recipient=cycle[0]))
-                    else:
-                        donations.append(Donation(donor=list(set(self.database.get_partner_donors(cycle[n])).intersection(set(self.database.get_compatible_donors(cycle[n+1]))))[0] , recipient=cycle[n+1]))
-
-                
-        if timelimit <= 0.0:
-            return Solution(donations=[])
-        if timelimit < math.inf:
-            self.solver.parameters.max_time_in_seconds = timelimit
-        return Solution(donations=donations)
\ No newline at end of file
+        for y, cycle in zip(self.y, self.cycles):
+            if self.solver.BooleanValue(y):
+                for i, k in zip(cycle, cycle[1:] + cycle[:1]):
+                    donations.append(Donation(donor=self.graph[i][k], recipient=k))
+        return Solution(donations=donations)
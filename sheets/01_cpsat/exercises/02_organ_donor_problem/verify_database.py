@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+
+from _alglab_utils import CHECK, main, mandatory_testcase
+from _db_impl import CachedTransplantDatabase, SqliteTransplantDatabase
+
+# Donors and recipients of all blood types, including unknown and NULL ones,
+# as (id, represents, blood type, tissue type) and (id, blood type, tissue type).
+DONORS = [
+    (1, 1, "O", 1),
+    (2, 2, "A", 1),
+    (3, 3, "B", 1),
+    (4, 4, "AB", 1),
+    (5, 5, "X", 1),
+    (6, 6, None, 1),
+    (7, 1, "O", None),
+    (8, 2, "O", 2),
+]
+RECIPIENTS = [
+    (1, "A", 1),
+    (2, "B", 1),
+    (3, "AB", 1),
+    (4, "O", 1),
+    (5, "X", 1),
+    (6, None, 1),
+    (7, "O", None),
+]
+
+
+def _write_database(path: str) -> None:
+    with sqlite3.connect(path) as dbcon:
+        dbcon.executescript(
+            """
+            CREATE TABLE recipients (
+                id INTEGER PRIMARY KEY, blood_type TEXT, tissue_type INTEGER
+            );
+            CREATE TABLE donors (
+                id INTEGER PRIMARY KEY,
+                represents INTEGER,
+                blood_type TEXT,
+                tissue_type INTEGER
+            );
+            """
+        )
+        dbcon.executemany("INSERT INTO recipients VALUES (?, ?, ?)", RECIPIENTS)
+        dbcon.executemany("INSERT INTO donors VALUES (?, ?, ?, ?)", DONORS)
+    dbcon.close()
+
+
+@mandatory_testcase(max_runtime_s=10)
+def cached_database_matches_sqlite():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "unknown_blood_types.db")
+        _write_database(path)
+        sqlite_db = SqliteTransplantDatabase(path)
+        cached_db = CachedTransplantDatabase(path)
+        CHECK(
+            set(cached_db.get_compatibility_edges())
+            == set(sqlite_db.get_compatibility_edges()),
+            "The compatibility edges of the databases differ.",
+        )
+        for recipient in sqlite_db.get_all_recipients():
+            CHECK(
+                set(cached_db.get_compatible_donors(recipient))
+                == set(sqlite_db.get_compatible_donors(recipient)),
+                f"The compatible donors of recipient {recipient.id} differ.",
+            )
+        for donor in sqlite_db.get_all_donors():
+            CHECK(
+                set(cached_db.get_compatible_recipients(donor))
+                == set(sqlite_db.get_compatible_recipients(donor)),
+                f"The compatible recipients of donor {donor.id} differ.",
+            )
+        sqlite_db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,93 +1,226 @@
+"""
+Visualization of solutions to the crossover transplant problem.
+
+The layout only depends on the pool, not on the solution, so it is computed
+once per database file and cached (in memory and, optionally, on disk), keyed
+by the hash of the file. Nodes and edges are drawn in a few vectorized calls
+(`scatter`, `LineCollection`, `quiver`) instead of one artist per element,
+such that solutions with thousands of patients render within a second. If an
+output file is given, the figure is rendered headless (no GUI backend needed).
+"""
+
 import argparse
-from typing import List
+import hashlib
+import math
+import os
+from typing import Dict, List, Optional, Tuple
 
-import matplotlib.pyplot as plt
 import networkx as nx
+import numpy as np
 from _db_impl import SqliteTransplantDatabase
-from data_schema import Donation, Donor, Recipient
+from cycles import exchange_graph
+from data_schema import Donation
 from database import TransplantDatabase
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 from solution_basic import CrossoverTransplantSolver
 from solution_small_cycles import CycleLimitingCrossoverTransplantSolver
 
+LAYOUTS = ("auto", "circular", "spring", "kamada_kawai")
+# The force-directed layouts are only used up to this number of patients.
+_FORCE_DIRECTED_LIMIT = 200
+# Nodes are only labeled up to this number of nodes.
+_LABEL_LIMIT = 100
+# Distance of a donor to the patient it represents, relative to the drawing.
+_DONOR_OFFSET = 0.04
+# Angle between the donors of the same patient.
+_DONOR_SPREAD = 0.35
+# Distance between the head of a donation arrow and its patient.
+_ARROW_SHRINK = 0.025
+
+# Positions of the patients and donors, keyed by node ("r_{id}" or "d_{id}").
+Layout = Dict[str, np.ndarray]
+_LAYOUT_CACHE: Dict[Tuple[str, str], Layout] = {}
+
+
+def database_hash(database: TransplantDatabase) -> str:
+    """
+    The hash of the database file, or of the pool if the database has no file.
+    """
+    digest = hashlib.sha256()
+    path = getattr(database, "path", None)
+    if path is not None and os.path.exists(path):
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(2**20), b""):
+                digest.update(chunk)
+    else:
+        for donor, recipient in sorted(
+            database.get_partner_map().items(), key=lambda pair: pair[0].id
+        ):
+            digest.update(f"{donor.id}:{recipient.id};".encode())
+    return digest.hexdigest()
+
+
+def _patient_layout(database: TransplantDatabase, layout: str) -> Dict[int, np.ndarray]:
+    """
+    Position the patients. The force-directed layouts place patients that can
+    exchange organs close to each other.
+    """
+    recipients = sorted(database.get_all_recipients(), key=lambda r: r.id)
+    if layout == "circular":
+        angles = np.linspace(0.0, 2 * math.pi, len(recipients), endpoint=False)
+        positions = np.column_stack([np.cos(angles), np.sin(angles)])
+        return {r.id: p for r, p in zip(recipients, positions)}
+    graph = nx.Graph()
+    graph.add_nodes_from(r.id for r in recipients)
+    graph.add_edges_from(
+        (i.id, k.id) for i, out in exchange_graph(database).items() for k in out
+    )
+    if layout == "spring":
+        return nx.spring_layout(graph, seed=0)
+    return nx.kamada_kawai_layout(graph)
+
+
+def pool_layout(
+    database: TransplantDatabase, layout: str = "auto", cache_dir: Optional[str] = None
+) -> Layout:
+    """
+    The positions of all patients and donors of the pool. Every donor is placed
+    next to the patient it represents.
+
+    Layouts are cached by the hash of the database file, in memory and, if a
+    cache directory is given, on disk.
+    """
+    if layout not in LAYOUTS:
+        msg = f"Unknown layout {layout}, use one of {LAYOUTS}."
+        raise ValueError(msg)
+    key = (database_hash(database), layout)
+    if key in _LAYOUT_CACHE:
+        return _LAYOUT_CACHE[key]
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir, f"{key[0]}_{layout}.npz")
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as data:
+                positions = dict(zip(data["nodes"], data["positions"]))
+            _LAYOUT_CACHE[key] = positions
+            return positions
+
+    partner = database.get_partner_map()
+    num_patients = len(set(partner.values()) | set(database.get_all_recipients()))
+    kind = layout
+    if kind == "auto":
+        kind = "spring" if num_patients <= _FORCE_DIRECTED_LIMIT else "circular"
+    patients = _patient_layout(database, kind)
+    positions = {f"r_{r}": np.asarray(p, dtype=float) for r, p in patients.items()}
+    center = np.mean(list(positions.values()), axis=0)
+    span = np.ptp(np.array(list(positions.values())), axis=0).max() or 1.0
+    donors_of: Dict[int, List[int]] = {}
+    for donor, recipient in partner.items():
+        donors_of.setdefault(recipient.id, []).append(donor.id)
+    for recipient, donors in donors_of.items():
+        # place the donors outwards of their patient, spread by a small angle
+        origin = positions[f"r_{recipient}"]
+        direction = origin - center
+        angle = math.atan2(direction[1], direction[0]) if direction.any() else 0.0
+        for n, donor in enumerate(sorted(donors)):
+            phi = angle + (n - (len(donors) - 1) / 2) * _DONOR_SPREAD
+            offset = _DONOR_OFFSET * span * np.array([math.cos(phi), math.sin(phi)])
+            positions[f"d_{donor}"] = origin + offset
+
+    _LAYOUT_CACHE[key] = positions
+    if cache_file is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(
+            cache_file,
+            nodes=np.array(list(positions)),
+            positions=np.array(list(positions.values())),
+        )
+    return positions
+
 
 def visualize_donations(
-    donations: List[Donation], database: TransplantDatabase, basic: bool
+    donations: List[Donation],
+    database: TransplantDatabase,
+    layout: str = "auto",
+    output: Optional[str] = None,
+    cache_dir: Optional[str] = None,
 ):
     """
     Visualize the donations utilizing a directed graph drawing:
 
-    In this directed graph, every node represents a patient and is labeled with their unique id.
-    Edges ('a', 'b') in this graph represent donations from a donor representing patient 'a' directly
-    to patient 'b'. All patients that do not receive a donation are marked with grey color.
+    In this directed graph, every node represents a patient or a donating donor
+    and is labeled with their unique id (for small drawings). Edges from a donor
+    to a patient represent donations, dotted lines connect a donor to the patient
+    it represents. All patients that do not receive a donation are marked with
+    grey color.
+
+    If `output` is given, the drawing is saved to this file (the format, e.g.,
+    PNG or SVG, is derived from its extension) instead of being shown.
     """
+    positions = pool_layout(database, layout, cache_dir)
+    partner = database.get_partner_map()
+    receiving = [f"r_{donation.recipient.id}" for donation in donations]
+    donating = [f"d_{donation.donor.id}" for donation in donations]
+    received = set(receiving)
+    left = [
+        f"r_{r.id}"
+        for r in database.get_all_recipients()
+        if f"r_{r.id}" not in received
+    ]
+    sources = np.array([positions[d] for d in donating]).reshape(-1, 2)
+    targets = np.array([positions[r] for r in receiving]).reshape(-1, 2)
+    partners = np.array(
+        [positions[f"r_{partner[donation.donor].id}"] for donation in donations]
+    ).reshape(-1, 2)
 
-    def patient_to_node(patient: Recipient):
-        return f"r_{patient.id}"
-
-    def donor_to_node(donor: Donor):
-        return f"d_{donor.id}"
-
-    involved_donors = {donation.donor for donation in donations}
-    involved_patients = {donation.recipient for donation in donations}
-
-    patient_nodes = set()
-    donor_nodes = set()
-    donation_edges = []
-    associaton_edges = []
-    for donation in donations:
-        # create recipient and donor nodes
-        r_node = patient_to_node(donation.recipient)
-        d_node = donor_to_node(donation.donor)
-        patient_nodes.add(r_node)
-        donor_nodes.add(d_node)
-        # add edge for donation
-        donation_edges.append((d_node, r_node))
-        # add edge to represent association
-        assoc_donors = (
-            set(database.get_partner_donors(donation.recipient)) & involved_donors
-        )
-        assert len(assoc_donors) == 1
-        associaton_edges.append((r_node, donor_to_node(assoc_donors.pop())))
-
-    left_patients = set(database.get_all_recipients()) ^ involved_patients
-    left_patient_nodes = {patient_to_node(p) for p in left_patients}
-
-    # construct digraph
-    full_donation_graph = nx.DiGraph()
-    full_donation_graph.add_nodes_from(patient_nodes)
-    full_donation_graph.add_nodes_from(donor_nodes)
-    full_donation_graph.add_nodes_from(left_patient_nodes)
-    full_donation_graph.add_edges_from(donation_edges)
-    full_donation_graph.add_edges_from(associaton_edges)
-    if basic:
-        layout = nx.kamada_kawai_layout(full_donation_graph)
+    if output is not None:
+        fig = Figure(figsize=(12, 8))  # headless, no GUI backend needed
     else:
-        layout = nx.fruchterman_reingold_layout(full_donation_graph)
+        # only load pyplot (and the GUI backend) if the figure is shown
+        import matplotlib.pyplot as plt
 
-    # create drawing, draw nodes and edges with different styles
-    fig, ax = plt.subplots(figsize=(12, 8))
-    nx.draw_networkx_nodes(
-        full_donation_graph, pos=layout, nodelist=patient_nodes, node_color="pink"
-    )
-    nx.draw_networkx_nodes(
-        full_donation_graph, pos=layout, nodelist=donor_nodes, node_color="lime"
-    )
-    nx.draw_networkx_nodes(
-        full_donation_graph, pos=layout, nodelist=left_patient_nodes, node_color="gray"
+        fig = plt.figure(figsize=(12, 8))
+    ax = fig.add_subplot()
+    num_nodes = len(receiving) + len(donating) + len(left)
+    size = 300 if num_nodes <= _LABEL_LIMIT else max(4, 30000 / num_nodes)
+    ax.add_collection(
+        LineCollection(
+            np.stack([partners, sources], axis=1),
+            colors="black",
+            linestyles=":",
+            linewidths=0.8,
+            zorder=1,
+        )
     )
-    nx.draw_networkx_labels(full_donation_graph, pos=layout)
-    nx.draw_networkx_edges(full_donation_graph, pos=layout, edgelist=donation_edges)
-    nx.draw_networkx_edges(
-        full_donation_graph,
-        pos=layout,
-        edgelist=associaton_edges,
-        arrows=False,
-        style=":",
+    # one arrow per donation, drawn as a single collection and ending in front
+    # of the patient, such that the arrow head is not hidden by the node
+    direction = targets - sources
+    length = np.linalg.norm(direction, axis=1, keepdims=True)
+    span = np.ptp(np.array(list(positions.values())), axis=0).max()
+    shrink = np.minimum(length / 2, _ARROW_SHRINK * span)
+    ax.quiver(
+        *sources.T,
+        *(direction * (1 - shrink / np.maximum(length, 1e-12))).T,
+        angles="xy",
+        scale_units="xy",
+        scale=1,
+        width=0.0015,
+        headwidth=7,
+        headlength=9,
+        zorder=2,
     )
+    for nodes, color in [(receiving, "pink"), (donating, "lime"), (left, "gray")]:
+        xy = np.array([positions[node] for node in nodes]).reshape(-1, 2)
+        ax.scatter(xy[:, 0], xy[:, 1], s=size, c=color, zorder=3)
+    if num_nodes <= _LABEL_LIMIT:
+        for node in receiving + donating + left:
+            ax.text(*positions[node], node, ha="center", va="center", fontsize=8)
 
     # create a custom legend
     custom_legend = [
-        plt.Line2D(
+        Line2D(
             [0],
             [0],
             marker="o",
@@ -103,16 +236,26 @@ def visualize_donations(
         ]
     ]
     custom_legend += [
-        plt.Line2D([0], [0], color="black", linestyle=style, label=name)
+        Line2D([0], [0], color="black", linestyle=style, label=name)
         for style, name in [("-", "Donation"), (":", "Association")]
     ]
-    ax.legend(handles=custom_legend)
-
-    plt.title(
-        f"{len(database.get_all_recipients())} patients, {len(donations)} crossover donations"
+    # searching the best location is slow for many nodes
+    ax.legend(
+        handles=custom_legend,
+        loc="best" if num_nodes <= _LABEL_LIMIT else "upper right",
+    )
+    ax.set_axis_off()
+    ax.set_aspect("equal")
+    ax.autoscale_view()
+    ax.set_title(
+        f"{len(received) + len(left)} patients, {len(donations)} crossover donations"
     )
     fig.tight_layout()
-    plt.show()
+
+    if output is not None:
+        fig.savefig(output)
+    else:
+        plt.show()
 
 
 if __name__ == "__main__":
@@ -124,10 +267,19 @@ if __name__ == "__main__":
     group.add_argument(
         "--cycle-limiting", action="store_true", help="Select cycle-limiting option"
     )
+    parser.add_argument("--instance", default="./instances/20.db")
+    parser.add_argument("--layout", default="auto", choices=LAYOUTS)
+    parser.add_argument(
+        "--output", default=None, help="Save the drawing (e.g., .png or .svg)."
+    )
+    parser.add_argument(
+        "--cache-dir", default=None, help="Where to cache the layouts on disk."
+    )
+    parser.add_argument("--timelimit", type=float, default=60.0)
     args = parser.parse_args()
 
     # sqlite database
-    db: TransplantDatabase = SqliteTransplantDatabase("./instances/20.db")
+    db: TransplantDatabase = SqliteTransplantDatabase(args.instance)
 
     # create solver based on arguments
     if args.basic:
@@ -135,8 +287,14 @@ if __name__ == "__main__":
     else:
         solver = CycleLimitingCrossoverTransplantSolver(database=db)
 
-    if solution := solver.optimize(60.0):
+    if solution := solver.optimize(args.timelimit):
         # visualize using graph
-        visualize_donations(donations=solution.donations, database=db, basic=args.basic)
+        visualize_donations(
+            donations=solution.donations,
+            database=db,
+            layout=args.layout,
+            output=args.output,
+            cache_dir=args.cache_dir,
+        )
     else:
         print("No solution returned!")
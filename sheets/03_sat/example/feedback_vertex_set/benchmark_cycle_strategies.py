@@ -0,0 +1,86 @@
+"""
+Compare the strategies for finding the cycles that are forbidden in every
+iteration of the SAT-based solver (see CycleStrategy in solver.py).
+
+Usage: python3 benchmark_cycle_strategies.py [--instances instances/graph1.edges]
+       [--random 60 100 5] [--strategies basis shortest packing]
+       [--max-cycles-per-round 50] [--timelimit 60]
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import networkx as nx
+from solver import CycleStrategy, FeedbackVertexSetSolverSAT, SearchStrategy
+from util import parse_graph_from_edgelist_file
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the cycle strategies of the SAT-based FVS solver."
+    )
+    parser.add_argument(
+        "--instances",
+        nargs="*",
+        default=sorted(glob.glob(os.path.join(INSTANCE_DIR, "*.edges"))),
+        help="Edge list files.",
+    )
+    parser.add_argument(
+        "--random",
+        type=int,
+        nargs=3,
+        metavar=("NODES", "EDGES", "COUNT"),
+        default=None,
+        help="Additionally use COUNT random graphs with the given size.",
+    )
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        type=CycleStrategy.from_str,
+        default=list(CycleStrategy),
+    )
+    parser.add_argument(
+        "--search-strategy",
+        type=SearchStrategy.from_str,
+        default=SearchStrategy.SEQUENTIAL_DOWN,
+    )
+    parser.add_argument("--max-cycles-per-round", type=int, default=None)
+    parser.add_argument("--timelimit", type=float, default=60.0)
+    args = parser.parse_args()
+
+    instances = [
+        (os.path.basename(path), parse_graph_from_edgelist_file(path))
+        for path in args.instances
+    ]
+    if args.random is not None:
+        num_nodes, num_edges, count = args.random
+        instances += [
+            (
+                f"gnm_{num_nodes}_{num_edges}_{seed}",
+                nx.gnm_random_graph(num_nodes, num_edges, seed=seed),
+            )
+            for seed in range(count)
+        ]
+
+    print(
+        f"{'instance':<20} {'strategy':<9} {'size':>5} {'clauses':>8} {'time[s]':>8}"
+    )
+    for name, graph in instances:
+        for strategy in args.strategies:
+            start = time.perf_counter()
+            solver = FeedbackVertexSetSolverSAT(
+                graph,
+                cycle_strategy=strategy,
+                max_cycles_per_round=args.max_cycles_per_round,
+            )
+            solution = solver.solve(args.timelimit, args.search_strategy)
+            print(
+                f"{name:<20} {strategy!s:<9} {len(solution):>5} "
+                f"{solver.sat_formula.num_cycle_clauses:>8} "
+                f"{time.perf_counter() - start:>8.2f}",
+                flush=True,
+            )
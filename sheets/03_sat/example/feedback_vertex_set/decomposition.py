@@ -0,0 +1,221 @@
+"""
+Every cycle of a graph lies within a single biconnected component (block), so
+the Feedback Vertex Set problem decomposes into much smaller problems:
+
+- Connected components are completely independent.
+- The blocks of a connected component form a tree (the block-cut tree), in
+  which neighboring blocks share a cut vertex. A cut vertex can break cycles
+  in several blocks at once, so simply combining optimal solutions of the
+  blocks is not optimal. Instead, the blocks are solved bottom-up: every block
+  is solved twice, once with the cut vertex to its parent selected and once
+  with it forbidden. The parent block then knows whether selecting the cut
+  vertex saves vertices below it (then it is always selected) or not (then it
+  is an ordinary vertex).
+
+The blocks of one level of the tree are independent and can be solved in
+parallel worker processes.
+"""
+
+import logging
+import multiprocessing
+import os
+import typing
+
+import networkx as nx
+from _timer import Timer
+from solver import FeedbackVertexSetSolverSAT, SearchStrategy
+from util import Node
+
+
+class _Block:
+    """
+    A biconnected component as node of the block-cut tree.
+    """
+
+    def __init__(
+        self, nodes: typing.Set[Node], parent: typing.Optional[Node], depth: int
+    ) -> None:
+        self.nodes = nodes
+        self.parent = parent  # the cut vertex shared with the parent block
+        self.depth = depth
+        # the child blocks, by the cut vertex they share with this block
+        self.children: typing.Dict[Node, typing.List["_Block"]] = {}
+        # The selected nodes of this block (without the parent) and the size of
+        # the solution for the whole subtree, by whether the parent is selected.
+        self.solution: typing.Dict[bool, typing.Set[Node]] = {}
+        self.cost: typing.Dict[bool, int] = {}
+
+    def states(self) -> typing.Tuple[bool, ...]:
+        """
+        The states of the parent to solve the block for.
+        """
+        return (True, False) if self.parent is not None else (False,)
+
+
+def block_cut_forest(graph: nx.Graph) -> typing.List[_Block]:
+    """
+    Build the block-cut tree of every connected component. The blocks are
+    returned in breadth-first order, i.e., every parent before its children.
+    """
+    blocks = [set(nodes) for nodes in nx.biconnected_components(graph)]
+    blocks_of_node: typing.Dict[Node, typing.List[int]] = {}
+    for i, nodes in enumerate(blocks):
+        for v in nodes:
+            blocks_of_node.setdefault(v, []).append(i)
+    visited = [False] * len(blocks)
+    order: typing.List[_Block] = []
+    for root in range(len(blocks)):
+        if visited[root]:
+            continue
+        visited[root] = True
+        order.append(_Block(blocks[root], parent=None, depth=0))
+        n = len(order) - 1
+        while n < len(order):
+            block = order[n]
+            n += 1
+            for v in block.nodes:
+                if v == block.parent:
+                    continue
+                for i in blocks_of_node[v]:
+                    if not visited[i]:
+                        visited[i] = True
+                        child = _Block(blocks[i], parent=v, depth=block.depth + 1)
+                        block.children.setdefault(v, []).append(child)
+                        order.append(child)
+    return order
+
+
+def _solve_part(
+    graph: nx.Graph,
+    forbidden: typing.Set[Node],
+    time_limit: float,
+    search_strategy: SearchStrategy,
+) -> typing.Set[Node]:
+    """
+    Solve a part of the graph. Executed in the worker processes.
+    """
+    if all(d == 2 for _, d in graph.degree):
+        # Only disjoint cycles: one vertex per cycle suffices.
+        return {
+            next(v for v in component if v not in forbidden)
+            for component in nx.connected_components(graph)
+        }
+    solver = FeedbackVertexSetSolverSAT(graph, forbidden=forbidden)
+    return solver.solve(time_limit, search_strategy)
+
+
+class DecomposingFeedbackVertexSetSolver:
+    """
+    Solves the Feedback Vertex Set problem for every block of the graph
+    separately (see above) with `FeedbackVertexSetSolverSAT`, and combines
+    the solutions to an optimal solution of the whole graph.
+    """
+
+    def __init__(
+        self,
+        graph: nx.Graph,
+        logger: typing.Optional[logging.Logger] = None,
+        processes: typing.Optional[int] = None,
+        min_parallel_parts: int = 16,
+    ) -> None:
+        """
+        :param processes: The number of worker processes (default: one per CPU).
+        :param min_parallel_parts: The minimal number of parts in one level of
+            the block-cut tree to solve them in parallel.
+        """
+        # Logs are easier to analyze and mange than prints.
+        self._logger = logger or logging.getLogger("FVS-Decomposition")
+        self.processes = processes or os.cpu_count() or 1
+        self.min_parallel_parts = min_parallel_parts
+        # A self-loop is a cycle on its own, but no biconnected component. Its
+        # node is selected and the blocks are built without it.
+        self.self_loops = set(nx.nodes_with_selfloops(graph))
+        self.graph = graph.subgraph(graph.nodes - self.self_loops)
+        self.blocks = block_cut_forest(self.graph)
+        self._logger.info(
+            "Decomposed the graph into %d blocks, the largest has %d nodes.",
+            len(self.blocks),
+            max((len(block.nodes) for block in self.blocks), default=0),
+        )
+
+    @staticmethod
+    def _forced_nodes(block: _Block) -> typing.Tuple[typing.Set[Node], int]:
+        """
+        The cut vertices to the children that are always selected, and the
+        size of the solutions of the subtrees below the block.
+        """
+        forced, cost = set(), 0
+        for v, children in block.children.items():
+            cost_selected = sum(child.cost[True] for child in children)
+            cost_not_selected = sum(child.cost[False] for child in children)
+            if cost_not_selected > cost_selected:
+                # Selecting v saves at least one vertex below it.
+                forced.add(v)
+                cost += 1 + cost_selected
+            else:
+                cost += cost_not_selected
+        return forced, cost
+
+    def solve(
+        self,
+        time_limit: float = 900,
+        search_strategy: SearchStrategy = SearchStrategy.SEQUENTIAL_DOWN,
+    ) -> typing.Set[Node]:
+        """
+        Finds the smallest FVS on the given graph. If the time limit is
+        reached, the solution is feasible but possibly not optimal.
+        """
+        timer = Timer(time_limit)
+        levels: typing.Dict[int, typing.List[_Block]] = {}
+        for block in self.blocks:
+            levels.setdefault(block.depth, []).append(block)
+        pool = None
+        try:
+            for depth in sorted(levels, reverse=True):
+                parts = []  # the parts for the SAT solver
+                for block in levels[depth]:
+                    forced, cost = self._forced_nodes(block)
+                    for selected in block.states():
+                        nodes = block.nodes - forced
+                        forbidden = set()
+                        if selected:
+                            nodes.discard(block.parent)
+                        elif block.parent is not None:
+                            forbidden.add(block.parent)
+                        block.solution[selected] = set(forced)
+                        block.cost[selected] = cost
+                        part = self.graph.subgraph(nodes)
+                        if len(part) > 2 and not nx.is_forest(part):
+                            parts.append((block, selected, part.copy(), forbidden))
+                if (
+                    pool is None
+                    and self.processes > 1
+                    and len(parts) >= self.min_parallel_parts
+                ):
+                    pool = multiprocessing.Pool(self.processes)
+                tasks = [
+                    (part, forbidden, max(timer.remaining(), 0.0), search_strategy)
+                    for _, _, part, forbidden in parts
+                ]
+                if pool is not None:
+                    results = pool.starmap(_solve_part, tasks)
+                else:
+                    results = [_solve_part(*task) for task in tasks]
+                for (block, selected, _, _), result in zip(parts, results):
+                    block.solution[selected] |= result
+                    block.cost[selected] += len(result)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        # Combine the solutions of the blocks top-down.
+        solution: typing.Set[Node] = set(self.self_loops)
+        stack = [(block, False) for block in self.blocks if block.parent is None]
+        while stack:
+            block, selected = stack.pop()
+            solution |= block.solution[selected]
+            for v, children in block.children.items():
+                stack.extend((child, v in solution) for child in children)
+        self._logger.info("Found FVS of size %d.", len(solution))
+        return solution
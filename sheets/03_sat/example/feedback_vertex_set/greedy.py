@@ -1,18 +1,105 @@
+import collections
+import heapq
+import itertools
+import typing
+
 import networkx as nx
-from util import Node, Set, find_cycle
+from util import Node, Set
 
 
-def greedy_fvs(graph: nx.Graph) -> Set[Node]:
+def greedy_fvs(
+    graph: nx.Graph, forbidden: typing.Iterable[Node] = (), improve: bool = True
+) -> Set[Node]:
     """
     This method generates a greedy solution to the Feedback Vertex Set problem.
-    The algorithm iteratively identifies and "breaks open" remaining cycles in the graph.
-    The utilized greedy strategy always removes the vertex with the highest degree from a
-    found cycle, as the chance for breaking open more than one cycle increases.
+    Vertices of degree <= 1 lie on no cycle and are stripped first. Of the
+    remaining vertices, the one with the highest degree is removed, as the chance
+    for breaking open more than one cycle increases, and the stripping continues.
+    The degrees are kept in a heap that is updated whenever a vertex loses a
+    neighbor, such that every step only touches the neighborhood of the removed
+    vertex. Forbidden vertices are never removed.
+
+    If `improve` is set, vertices that have become redundant afterwards (because
+    the vertices removed later already break all their cycles) are dropped again.
     """
-    graph = graph.copy()
+    forbidden = set(forbidden)
+    neighbors = {v: set(graph.neighbors(v)) for v in graph.nodes}
     feedback_vertex_set = set()
-    while (cycle := find_cycle(graph)) is not None:
-        highest_degree_vertex = max(cycle, key=lambda v: graph.degree(v))
-        graph.remove_node(highest_degree_vertex)
-        feedback_vertex_set.add(highest_degree_vertex)
+    heap = []  # (-degree, tie breaker, vertex), may contain outdated entries
+    tie_breaker = itertools.count()
+    queue = collections.deque()  # vertices that may have degree <= 1
+
+    def remove(v: Node) -> None:
+        for w in neighbors.pop(v):
+            if w == v:
+                continue
+            neighbors[w].discard(v)
+            if len(neighbors[w]) <= 1:
+                queue.append(w)
+            elif w not in forbidden:
+                heapq.heappush(heap, (-len(neighbors[w]), next(tie_breaker), w))
+
+    def select(v: Node) -> None:
+        if v in forbidden:
+            msg = "A cycle consists of forbidden vertices only."
+            raise ValueError(msg)
+        feedback_vertex_set.add(v)
+        remove(v)
+
+    # A vertex with a self-loop is a cycle on its own.
+    for v in [v for v in neighbors if v in neighbors[v]]:
+        select(v)
+    queue.extend(neighbors)
+    for v in neighbors:
+        if v not in forbidden:
+            heapq.heappush(heap, (-len(neighbors[v]), next(tie_breaker), v))
+    while True:
+        while queue:
+            v = queue.popleft()
+            if v in neighbors and len(neighbors[v]) <= 1:
+                remove(v)
+        if not neighbors:
+            break
+        # Every remaining vertex has degree >= 2, i.e., lies on a cycle.
+        while heap:
+            degree, _, v = heapq.heappop(heap)
+            if v in neighbors and -degree == len(neighbors[v]):
+                break
+        else:
+            msg = "A cycle consists of forbidden vertices only."
+            raise ValueError(msg)
+        select(v)
+    if improve:
+        _remove_redundant_vertices(graph, feedback_vertex_set)
     return feedback_vertex_set
+
+
+def _remove_redundant_vertices(
+    graph: nx.Graph, feedback_vertex_set: Set[Node]
+) -> None:
+    """
+    Drops every vertex of the feedback vertex set whose neighbors in the
+    remaining forest lie in pairwise different trees, as adding it back does
+    not close a cycle. The trees are tracked with a union-find structure, and
+    vertices of low degree are tried first, as they are the most likely to be
+    redundant.
+    """
+    parent = {v: v for v in graph.nodes}
+
+    def find(v: Node) -> Node:
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for v, w in graph.edges:
+        if v not in feedback_vertex_set and w not in feedback_vertex_set:
+            parent[find(v)] = find(w)
+    for v in sorted(feedback_vertex_set, key=graph.degree):
+        if graph.has_edge(v, v):
+            continue
+        roots = [find(w) for w in graph.neighbors(v) if w not in feedback_vertex_set]
+        if len(set(roots)) == len(roots):
+            feedback_vertex_set.remove(v)
+            for root in roots:
+                parent[root] = v
@@ -0,0 +1,114 @@
+"""
+Kernelization for the Feedback Vertex Set problem: simple reduction rules that
+shrink the graph before it is encoded as SAT formula, without changing the
+size of an optimal solution.
+
+The rules are usually stated for multigraphs:
+
+1. A vertex of degree <= 1 is on no cycle and can be removed.
+2. A vertex v of degree 2 can be bypassed, i.e., replaced by an edge between
+   its neighbors a and b: every cycle through v also passes a and b, so
+   selecting a or b instead of v is never worse.
+3. A vertex with a self-loop (or, in a multigraph, a double edge to a vertex
+   of degree 2) must be selected.
+
+We stay with simple graphs: if a and b are already adjacent, bypassing v would
+create a double edge, so v is kept instead. If a (or b) has degree 2, too,
+then v and a only lie on the triangle (v, a, b), which is the double edge with
+a vertex of degree 2 of rule 3, and b is selected.
+
+Removed vertices are never part of the solution and the selected vertices are
+recorded, such that `lift` turns a solution of the kernel into a solution of
+the original graph.
+"""
+
+import collections
+import typing
+
+import networkx as nx
+from util import Node
+
+
+class Kernel:
+    """
+    The reduced graph (kernel) of a Feedback Vertex Set instance.
+    """
+
+    def __init__(
+        self,
+        graph: nx.Graph,
+        forbidden: typing.Iterable[Node] = (),
+        reduce: bool = True,
+    ) -> None:
+        """
+        :param graph: The original graph. It is not modified.
+        :param forbidden: Vertices that must not be part of the solution.
+        :param reduce: Apply the reduction rules (otherwise, the kernel is the graph).
+        """
+        self.original_num_nodes = graph.number_of_nodes()
+        self.original_num_edges = graph.number_of_edges()
+        self.forced: typing.Set[Node] = set()  # the vertices selected by the rules
+        self.forbidden = set(forbidden)
+        if not reduce:
+            self.graph = graph
+            return
+        self.graph = graph.copy()
+        queue = collections.deque(self.graph.nodes)
+        # Rule 3 for self-loops comes first, as they count towards the degree.
+        for v in list(nx.nodes_with_selfloops(self.graph)):
+            self._select(v, queue)
+        while queue:
+            v = queue.popleft()
+            if v in self.graph:
+                self._reduce(v, queue)
+        self.forbidden &= set(self.graph.nodes)
+
+    def _remove(self, v: Node, queue: typing.Deque[Node]) -> None:
+        # the neighbors lose a degree and may become reducible
+        queue.extend(self.graph.neighbors(v))
+        self.graph.remove_node(v)
+
+    def _select(self, v: Node, queue: typing.Deque[Node]) -> None:
+        if v in self.forbidden:
+            msg = "A cycle consists of forbidden vertices only."
+            raise ValueError(msg)
+        self.forced.add(v)
+        self._remove(v, queue)
+
+    def _reduce(self, v: Node, queue: typing.Deque[Node]) -> None:
+        """
+        Apply the first applicable rule to v.
+        """
+        degree = self.graph.degree(v)
+        if degree <= 1:
+            self._remove(v, queue)
+        elif degree == 2:
+            a, b = self.graph.neighbors(v)
+            if not self.graph.has_edge(a, b):
+                # Bypass v, unless v is the only vertex of the three that may
+                # be selected.
+                if v in self.forbidden or not {a, b} <= self.forbidden:
+                    self.graph.remove_node(v)
+                    self.graph.add_edge(a, b)
+                    queue.extend((a, b))
+                return
+            for u, w in ((a, b), (b, a)):
+                if self.graph.degree(u) == 2:
+                    # The triangle (v, u, w) hangs at w. Select w, as it may
+                    # break further cycles, or v or u if w is forbidden.
+                    allowed = [x for x in (w, v, u) if x not in self.forbidden]
+                    self._select(allowed[0] if allowed else w, queue)
+                    return
+
+    def lift(self, solution: typing.Iterable[Node]) -> typing.Set[Node]:
+        """
+        Turn a solution for the kernel into a solution for the original graph.
+        """
+        return set(solution) | self.forced
+
+    def __str__(self) -> str:
+        return (
+            f"Kernel with {self.graph.number_of_nodes()}/{self.original_num_nodes}"
+            f" nodes and {self.graph.number_of_edges()}/{self.original_num_edges}"
+            f" edges, {len(self.forced)} nodes selected"
+        )
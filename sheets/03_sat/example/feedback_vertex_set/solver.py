@@ -6,8 +6,10 @@ from enum import Enum
 import networkx as nx  # pip install networkx
 from _timer import Timer
 from greedy import greedy_fvs
-from pysat.solvers import Solver as SATSolver  # pip install python-sat
-from util import Node
+from kernelization import Kernel
+from pysat.card import ITotalizer  # pip install python-sat
+from pysat.solvers import Solver as SATSolver
+from util import IndexedGraph, Node
 
 
 class _NodeVars:
@@ -47,51 +49,142 @@ class _NodeVars:
         return {self.node(x)[0] for x in model if x in self._reverse}
 
 
+class CycleStrategy(Enum):
+    """
+    Different strategies for finding the cycles to forbid in each iteration.
+    """
+
+    BASIS = 1  # A cycle basis of the remaining graph.
+    SHORTEST = 2  # A shortest cycle through every remaining node.
+    PACKING = 3  # Vertex-disjoint short cycles, which also give a lower bound.
+
+    def __str__(self):
+        return self.name.title()
+
+    @staticmethod
+    def from_str(s: str):
+        return CycleStrategy[s.upper()]
+
+
 class FeedbackVertexSetDecisionVariant:
     """
     A SAT-based solver for checking if a given graph contains a Feedback Vertex Set of size k.
     Iteratively used for the optimization to find the smallest feasible k.
+
+    The same formula is used for all k: only limits that hold permanently are part
+    of the formula, all others are activated by assumptions in the calls of the
+    SAT-solver. Thus, k can be decreased and increased again, and the cycle
+    clauses (and everything the SAT-solver learned from them) are kept.
     """
 
     def __init__(
-        self, graph: nx.Graph, k: int, logger: typing.Optional[logging.Logger] = None
+        self,
+        graph: nx.Graph,
+        k: int,
+        logger: typing.Optional[logging.Logger] = None,
+        forbidden: typing.Iterable[Node] = (),
+        cycle_strategy: CycleStrategy = CycleStrategy.BASIS,
+        max_cycles_per_round: typing.Optional[int] = None,
     ) -> None:
         # Logs are easier to analyze and mange than prints.
         self._logger = logger or logging.getLogger("FVS-SAT")
         self.graph = graph
         self.k = k
+        self.cycle_strategy = cycle_strategy
+        self.max_cycles_per_round = max_cycles_per_round
+        self.num_cycle_clauses = 0
         self._logger.info("Building SAT formula for FVS of size %d.", k)
         self.solver = SATSolver("Minicard")
         self.node_vars = _NodeVars(graph)
+        # for finding the remaining cycles without copying the graph
+        self.indexed_graph = IndexedGraph(graph)
+        # Permanent limits are native cardinality constraints, all other limits
+        # are assumed (see _assumptions).
+        self._fixed_limit = graph.number_of_nodes()
+        self._totalizer: typing.Optional[ITotalizer] = None
         self.limit_k(k)
-        self._find_and_handle_cycle_basis(graph)
+        # Forbidden nodes must not be selected.
+        for v in forbidden:
+            self.solver.add_clause([self.node_vars.not_x(v)])
+        self._find_and_handle_cycles()
         self._logger.info("SAT formula built.")
 
-    def _find_and_handle_cycle_basis(self, subgraph: nx.Graph) -> int:
+    def _find_cycles(
+        self, removed: typing.Iterable[Node]
+    ) -> typing.List[typing.List[Node]]:
         """
-        For a given graph (likely a subgraph of self.graph), find the cycle basis,
-        add clauses to select at least one node per cycle. A cycle basis, calculable
-        in polynomial time, is a set of combinable cycles to construct any graph cycle.
-        This method returns the found cycle basis size.
+        Find cycles in the graph without the removed nodes, according to the
+        cycle strategy:
+        - BASIS: A cycle basis, calculable in polynomial time, is a set of combinable
+            cycles to construct any graph cycle.
+        - SHORTEST: The shortest cycle through every node. Short cycles give short
+            clauses, which propagate much better.
+        - PACKING: Vertex-disjoint short cycles. Fewer clauses per round, but each
+            of them needs its own node.
+        At most max_cycles_per_round cycles are returned (the shortest ones of
+        the basis).
         """
-        cycle_list = nx.cycle_basis(subgraph)
+        limit = self.max_cycles_per_round
+        if self.cycle_strategy == CycleStrategy.SHORTEST:
+            return self.indexed_graph.shortest_cycles(removed, limit)
+        if self.cycle_strategy == CycleStrategy.PACKING:
+            return self.indexed_graph.cycle_packing(removed, limit)
+        cycle_list = self.indexed_graph.cycle_basis(removed)
+        if limit is not None and len(cycle_list) > limit:
+            cycle_list = sorted(cycle_list, key=len)[:limit]
+        return cycle_list
+
+    def _find_and_handle_cycles(self, removed: typing.Iterable[Node] = ()) -> int:
+        """
+        For the graph without the removed nodes, find cycles and add clauses
+        to select at least one node per cycle.
+        This method returns the number of found cycles.
+        """
+        cycle_list = self._find_cycles(removed)
         for cycle in cycle_list:
             # at least one node per cycle must be selected (positive variable assignment)
             self.solver.add_clause([self.node_vars.x(v) for v in cycle])
+        self.num_cycle_clauses += len(cycle_list)
         self._logger.info("Added %d cycle constraints.", len(cycle_list))
         return len(cycle_list)
 
     def limit_k(self, k: int):
         """
         Update the model in order to enforce a new limit of k selected nodes.
+        The limit may also be increased again.
         """
-        if k > self.k:
-            # Increasing k is not possible without resetting the solver.
-            msg = "The new value for k must be smaller than the old value."
-            raise ValueError(msg)
+        self.k = max(k, 0)
 
-        self.solver.add_atmost([self.node_vars.x(v) for v in self.graph.nodes], k)
-        self.k = k
+    def fix_limit(self, k: int):
+        """
+        Permanently exclude solutions with more than k selected nodes, e.g.,
+        because a solution with k+1 nodes is already known.
+        """
+        k = max(k, 0)
+        if k < self._fixed_limit:
+            self.solver.add_atmost([self.node_vars.x(v) for v in self.graph.nodes], k)
+            self._fixed_limit = k
+
+    def _assumptions(self) -> typing.List[int]:
+        """
+        The assumptions that enforce the limit of k selected nodes.
+
+        Limits below the fixed limit are enforced by the outputs of a totalizer,
+        a counter over the node variables: output j is true if more than j nodes
+        are selected, so assuming its negation limits the selection to j nodes.
+        The totalizer is only built when needed and only counts up to the fixed
+        limit, as its size grows with the number of nodes times this limit.
+        """
+        if self.k >= self._fixed_limit:
+            return []
+        if self._totalizer is None:
+            self._totalizer = ITotalizer(
+                lits=[self.node_vars.x(v) for v in self.graph.nodes],
+                ubound=self._fixed_limit,
+                top_id=self.graph.number_of_nodes(),
+            )
+            self.solver.append_formula(self._totalizer.cnf.clauses)
+        return [-self._totalizer.rhs[self.k]]
 
     def solve(self, time_limit: float = 900) -> typing.Optional[typing.Set[Node]]:
         """
@@ -103,19 +196,17 @@ class FeedbackVertexSetDecisionVariant:
         """
         # As long as the SAT solver returns "satisfiable"
         timer = Timer(time_limit)
-        while self.solver.solve():
+        while self.solver.solve(assumptions=self._assumptions()):
             timer.check()  # throws TimeoutError if time is up
             # Retrieve the solution from the solver.
             model = self.solver.get_model()
             assert model is not None
             feedback_nodes = self.node_vars.get_node_selection(model)
-            # get subgraph induced by the graph excluding the feedback nodes
-            subgraph = self.graph.copy()
-            subgraph.remove_nodes_from(feedback_nodes)
-            # Add constraint to forbid found cycle and solve again.
+            # Add constraint to forbid the cycles in the graph excluding the
+            # feedback nodes and solve again.
             # This approach is efficient as the solver continues from its stop point.
             # Fewer constraints lead to simpler, faster solved models despite potential exponential constraints.
-            num_cycles = self._find_and_handle_cycle_basis(subgraph)
+            num_cycles = self._find_and_handle_cycles(feedback_nodes)
             if num_cycles != 0:
                 # The resulting graph contained cycles. Resolve with the newly added constraints.
                 continue
@@ -126,6 +217,11 @@ class FeedbackVertexSetDecisionVariant:
         # The SAT-solver proved the formula to be infeasible.
         # This proves that there exists no FVS of size k.
         self._logger.info("No FVS of size %d exists.", self.k)
+        # Every FVS has more than k nodes, which helps later calls with larger k.
+        self.solver.add_atmost(
+            [self.node_vars.not_x(v) for v in self.graph.nodes],
+            self.graph.number_of_nodes() - self.k - 1,
+        )
         return None
 
 
@@ -151,20 +247,57 @@ class FeedbackVertexSetSolverSAT:
     A solver for the Feedback Vertex Set problem that uses a SAT-solver
     to check if a given graph contains a FVS of size k. By iteratively
     trying out different values for k, the smallest FVS is found.
+
+    The graph is first reduced to its kernel (see kernelization.py), and
+    the SAT-solver only works on the kernel. The bounds and k always refer
+    to the original graph, i.e., they include the nodes selected by the
+    reduction rules.
     """
 
     def __init__(
-        self, graph: nx.Graph, logger: typing.Optional[logging.Logger] = None
+        self,
+        graph: nx.Graph,
+        logger: typing.Optional[logging.Logger] = None,
+        forbidden: typing.Iterable[Node] = (),
+        kernelize: bool = True,
+        cycle_strategy: CycleStrategy = CycleStrategy.BASIS,
+        max_cycles_per_round: typing.Optional[int] = None,
     ) -> None:
+        """
+        The forbidden nodes must not be part of the feedback vertex set.
+        The cycle strategy and the maximal number of cycles per round determine
+        the cycles that are forbidden in each iteration (see CycleStrategy).
+        """
         # Logs are easier to analyze and mange than prints.
         self._logger = logger or logging.getLogger("FVS-Optimizer")
         self.graph = graph
-        self.best_solution = greedy_fvs(graph)
+        self.kernel = Kernel(graph, forbidden, reduce=kernelize)
+        self._logger.info("%s.", self.kernel)
+        self.best_solution = self.kernel.lift(
+            greedy_fvs(self.kernel.graph, forbidden=self.kernel.forbidden)
+        )
         self.upper_bound = len(self.best_solution)
-        self.lower_bound = 0
+        self.lower_bound = len(self.kernel.forced)
         self.sat_formula = FeedbackVertexSetDecisionVariant(
-            graph, k=len(self.best_solution)
+            self.kernel.graph,
+            k=self._kernel_k(self.upper_bound),
+            forbidden=self.kernel.forbidden,
+            cycle_strategy=cycle_strategy,
+            max_cycles_per_round=max_cycles_per_round,
         )
+        # Only solutions better than the greedy one are of interest.
+        self.sat_formula.fix_limit(self._kernel_k(self.upper_bound) - 1)
+        # Every one of a set of vertex-disjoint cycles needs its own node. If this
+        # lower bound matches the greedy solution, no SAT call is needed at all.
+        packing = self.sat_formula.indexed_graph.cycle_packing()
+        self._logger.info("Found %d vertex-disjoint cycles.", len(packing))
+        self._add_lower_bound(len(self.kernel.forced) + len(packing))
+
+    def _kernel_k(self, k: int) -> int:
+        """
+        The number of nodes to select in the kernel for a solution of size k.
+        """
+        return k - len(self.kernel.forced)
 
     def _add_solution(self, solution: typing.Set):
         k = len(solution)
@@ -172,7 +305,8 @@ class FeedbackVertexSetSolverSAT:
             self._logger.info("A solution of size %d was found!", k)
             self.upper_bound = k
             self.best_solution = solution
-            self.sat_formula.limit_k(k)
+            # Only smaller solutions are of interest from now on.
+            self.sat_formula.fix_limit(self._kernel_k(k) - 1)
 
     def _add_lower_bound(self, lower_bound: int):
         if lower_bound > self.lower_bound:
@@ -197,13 +331,12 @@ class FeedbackVertexSetSolverSAT:
         return k
 
     def _solve_for_k(self, k: int, timer: Timer) -> typing.Optional[typing.Set[Node]]:
-        # Check if <=k is feasible.
-        if k <= self.sat_formula.k:  # Reuse the SAT-formula if possible
-            self.sat_formula.limit_k(k)
-        else:
-            # If we increase k, we need to reset the model.
-            self.sat_formula = FeedbackVertexSetDecisionVariant(self.graph, k=k)
-        return self.sat_formula.solve(timer.remaining())
+        # Check if <=k is feasible. The SAT-formula is reused for every k.
+        self.sat_formula.limit_k(self._kernel_k(k))
+        kernel_solution = self.sat_formula.solve(timer.remaining())
+        if kernel_solution is None:
+            return None
+        return self.kernel.lift(kernel_solution)
 
     def solve(
         self,
@@ -0,0 +1,55 @@
+"""
+A self-loop is a cycle on its own, so its vertex must be part of every
+feedback vertex set.
+
+Run with `python -m pytest` from this directory.
+"""
+
+import networkx as nx
+import pytest
+from decomposition import DecomposingFeedbackVertexSetSolver
+from solver import CycleStrategy, FeedbackVertexSetSolverSAT
+from util import IndexedGraph
+
+# edges and the size of an optimal solution
+GRAPHS = [
+    ([(1, 1), (2, 3), (3, 4), (4, 2)], 2),
+    ([(1, 2), (2, 3), (3, 1), (3, 3), (3, 4)], 1),
+    ([(1, 1), (1, 2), (2, 2), (2, 3)], 2),
+]
+
+
+def is_feedback_vertex_set(graph: nx.Graph, solution) -> bool:
+    remaining = graph.copy()
+    remaining.remove_nodes_from(solution)
+    return nx.number_of_selfloops(remaining) == 0 and nx.is_forest(remaining)
+
+
+def test_cycle_searches_report_self_loops():
+    graph = nx.Graph(GRAPHS[0][0])
+    indexed_graph = IndexedGraph(graph)
+    assert [1] in indexed_graph.cycle_basis()
+    assert [1] in indexed_graph.shortest_cycles()
+    assert [1] in indexed_graph.cycle_packing()
+    assert [1] not in indexed_graph.cycle_basis(removed=[1])
+
+
+@pytest.mark.parametrize(("edges", "optimum"), GRAPHS)
+@pytest.mark.parametrize("kernelize", [True, False])
+@pytest.mark.parametrize("cycle_strategy", list(CycleStrategy))
+def test_solver_selects_self_loops(edges, optimum, kernelize, cycle_strategy):
+    graph = nx.Graph(edges)
+    solver = FeedbackVertexSetSolverSAT(
+        graph, kernelize=kernelize, cycle_strategy=cycle_strategy
+    )
+    solution = solver.solve(10)
+    assert is_feedback_vertex_set(graph, solution)
+    assert len(solution) == optimum
+
+
+@pytest.mark.parametrize(("edges", "optimum"), GRAPHS)
+def test_decomposition_selects_self_loops(edges, optimum):
+    graph = nx.Graph(edges)
+    solution = DecomposingFeedbackVertexSetSolver(graph, processes=1).solve(10)
+    assert is_feedback_vertex_set(graph, solution)
+    assert len(solution) == optimum
@@ -1,4 +1,4 @@
-from typing import Any, List, Optional, Set, Tuple
+from typing import Any, Iterable, List, Optional, Set, Tuple
 
 import matplotlib.pyplot as plt
 import networkx as nx
@@ -40,6 +40,234 @@ def find_cycle(graph: nx.Graph) -> Optional[List[Node]]:
         return None
 
 
+class IndexedGraph:
+    """
+    A static copy of a graph with the nodes numbered 0, ..., n-1 and the adjacency
+    stored in compressed sparse row (CSR) format: the neighbors of node i are
+    indices[indptr[i]:indptr[i+1]].
+
+    Cycles in the graph without some removed nodes are found with a mask on the
+    nodes, instead of copying the graph. All working memory is allocated once,
+    such that repeated searches (e.g., once per SAT iteration) are cheap.
+    """
+
+    def __init__(self, graph: nx.Graph) -> None:
+        self.nodes: List[Node] = list(graph.nodes)
+        self.index = {v: i for i, v in enumerate(self.nodes)}
+        self.indptr = [0]
+        self.indices: List[int] = []
+        for v in self.nodes:
+            self.indices.extend(self.index[w] for w in graph.neighbors(v))
+            self.indptr.append(len(self.indices))
+        n = len(self.nodes)
+        # A self-loop is a cycle on its own, which the searches report first.
+        self._loop = bytearray(graph.has_edge(v, v) for v in self.nodes)
+        # Nodes that are removed or on no cycle of the remaining graph, and the
+        # degrees of the other nodes.
+        self._dead = bytearray(n)
+        self._all_alive = bytes(n)
+        self._degree = [0] * n
+        # The BFS state is only valid for the nodes stamped with the current
+        # round, which saves resetting it before every search.
+        self._round = 0
+        self._seen = [0] * n
+        self._done = [0] * n
+        self._parent = [0] * n
+        self._depth = [0] * n
+        self._branch = [0] * n
+        self._queue = [0] * n
+
+    def cycle_basis(self, removed: Iterable[Node] = ()) -> List[List[Node]]:
+        """
+        Return a cycle basis of the graph without the removed nodes: the
+        fundamental cycles of a breadth-first spanning forest, one for every
+        edge that is not in the forest.
+        """
+        self._mark_removed(removed)
+        return [[self.nodes[i] for i in cycle] for cycle in self._cycle_basis()]
+
+    def shortest_cycles(
+        self, removed: Iterable[Node] = (), limit: Optional[int] = None
+    ) -> List[List[Node]]:
+        """
+        Return a shortest cycle through every node of the graph without the
+        removed nodes. Nodes on an already found cycle are skipped, as their
+        cycle is usually (almost) as short.
+        """
+        core = self._residual_core(removed)
+        covered = set()
+        cycles = []
+        for v in core:
+            if v in covered or (cycle := self._shortest_cycle_through(v)) is None:
+                continue
+            covered.update(cycle)
+            cycles.append([self.nodes[i] for i in cycle])
+            if limit is not None and len(cycles) >= limit:
+                break
+        return cycles
+
+    def cycle_packing(
+        self, removed: Iterable[Node] = (), limit: Optional[int] = None
+    ) -> List[List[Node]]:
+        """
+        Greedily pack vertex-disjoint short cycles in the graph without the
+        removed nodes: repeatedly take a shortest cycle through a node of
+        minimal degree and remove its nodes.
+
+        Every feedback vertex set needs a distinct node of each of the cycles,
+        so the number of cycles is a lower bound for the removed graph.
+        """
+        core = self._residual_core(removed)
+        dead, degree = self._dead, self._degree
+        cycles = []
+        for v in sorted(core, key=lambda v: degree[v]):
+            if dead[v] or (cycle := self._shortest_cycle_through(v)) is None:
+                continue
+            cycles.append([self.nodes[i] for i in cycle])
+            if limit is not None and len(cycles) >= limit:
+                break
+            for i in cycle:
+                dead[i] = 1
+            self._peel(cycle)
+        return cycles
+
+    def _mark_removed(self, removed: Iterable[Node]) -> None:
+        dead = self._dead
+        dead[:] = self._all_alive
+        for v in removed:
+            dead[self.index[v]] = 1
+
+    def _residual_core(self, removed: Iterable[Node]) -> List[int]:
+        """
+        Mark the removed nodes and the nodes outside of the 2-core of the
+        remaining graph (which are on no cycle) as dead. Returns the 2-core.
+        """
+        dead, degree = self._dead, self._degree
+        indptr, indices = self.indptr, self.indices
+        self._mark_removed(removed)
+        queue = []
+        for v in range(len(self.nodes)):
+            if dead[v]:
+                continue
+            neighbors = range(indptr[v], indptr[v + 1])
+            # a self-loop counts twice, such that its node is never peeled
+            degree[v] = sum(not dead[indices[j]] for j in neighbors) + self._loop[v]
+            if degree[v] < 2:
+                queue.append(v)
+        for v in queue:
+            dead[v] = 1
+        self._peel(queue)
+        return [v for v in range(len(self.nodes)) if not dead[v]]
+
+    def _peel(self, queue: List[int]) -> None:
+        """
+        Update the degrees for the nodes that died and remove the nodes whose
+        degree drops below two.
+        """
+        dead, degree = self._dead, self._degree
+        indptr, indices = self.indptr, self.indices
+        while queue:
+            v = queue.pop()
+            for j in range(indptr[v], indptr[v + 1]):
+                w = indices[j]
+                if not dead[w]:
+                    degree[w] -= 1
+                    if degree[w] < 2:
+                        dead[w] = 1
+                        queue.append(w)
+
+    def _cycle_basis(self) -> List[List[int]]:
+        self._round += 1
+        stamp, seen, done = self._round, self._seen, self._done
+        parent, depth, queue = self._parent, self._depth, self._queue
+        indptr, indices, dead = self.indptr, self.indices, self._dead
+        # The BFS skips self-loops, as a node is not done while it is visited.
+        cycles = [[v] for v in range(len(self.nodes)) if self._loop[v] and not dead[v]]
+        for root in range(len(self.nodes)):
+            if dead[root] or seen[root] == stamp:
+                continue
+            seen[root], parent[root], depth[root] = stamp, root, 0
+            queue[0], head, tail = root, 0, 1
+            while head < tail:
+                v = queue[head]
+                head += 1
+                for j in range(indptr[v], indptr[v + 1]):
+                    w = indices[j]
+                    if dead[w]:
+                        continue
+                    if seen[w] != stamp:
+                        seen[w], parent[w], depth[w] = stamp, v, depth[v] + 1
+                        queue[tail] = w
+                        tail += 1
+                    elif done[w] == stamp and parent[v] != w:
+                        # a non-tree edge, seen from its second endpoint
+                        cycles.append(self._fundamental_cycle(v, w))
+                done[v] = stamp
+        return cycles
+
+    def _shortest_cycle_through(self, root: int) -> Optional[List[int]]:
+        """
+        A shortest cycle through the root, or None. Every node reached by the
+        BFS remembers the neighbor of the root it was reached through (its
+        branch); an edge between two branches closes a cycle through the root.
+        """
+        if self._loop[root]:
+            return [root]
+        self._round += 1
+        stamp, seen, branch = self._round, self._seen, self._branch
+        parent, depth, queue = self._parent, self._depth, self._queue
+        indptr, indices, dead = self.indptr, self.indices, self._dead
+        seen[root], parent[root], depth[root], branch[root] = stamp, root, 0, root
+        queue[0], head, tail = root, 0, 1
+        best, best_length = None, len(self.nodes) + 1
+        while head < tail:
+            v = queue[head]
+            head += 1
+            if 2 * depth[v] + 1 >= best_length:
+                break  # all further cycles are at least as long
+            for j in range(indptr[v], indptr[v + 1]):
+                w = indices[j]
+                if dead[w]:
+                    continue
+                if seen[w] != stamp:
+                    seen[w], parent[w], depth[w] = stamp, v, depth[v] + 1
+                    branch[w] = w if v == root else branch[v]
+                    queue[tail] = w
+                    tail += 1
+                elif w != parent[v] and branch[w] != branch[v]:
+                    if depth[v] + depth[w] + 1 < best_length:
+                        best, best_length = (v, w), depth[v] + depth[w] + 1
+        if best is None:
+            return None
+        v, w = best
+        left, right = [v], [w]
+        while left[-1] != root:
+            left.append(parent[left[-1]])
+        while right[-1] != root:
+            right.append(parent[right[-1]])
+        right.pop()  # the root is already in left
+        return left[::-1] + right
+
+    def _fundamental_cycle(self, u: int, w: int) -> List[int]:
+        """
+        The cycle of the tree paths from u and w to their common ancestor.
+        """
+        parent, depth = self._parent, self._depth
+        left, right = [u], [w]
+        while depth[u] > depth[w]:
+            u = parent[u]
+            left.append(u)
+        while depth[w] > depth[u]:
+            w = parent[w]
+            right.append(w)
+        while u != w:
+            u, w = parent[u], parent[w]
+            left.append(u)
+            right.append(w)
+        right.pop()  # the common ancestor is already in left
+        return left + right[::-1]
+
+
 def visualize_fvs(graph: nx.Graph, feedback_vertex_set: Set[Node]):
     """
     Draws a 'before-after' visualization of a given Feedback Vertex Set solution on a given graph.